@@ -0,0 +1,129 @@
+// Diagram search widget
+// Loads the sharded index written by scripts/generate-diagram-index.py on
+// first use, and only fetches the shards the typed words need.
+(function () {
+  var MAX_RESULTS = 8;
+  var TOKEN = /[a-z0-9]+/g;
+
+  function init(widget) {
+    var input = widget.querySelector('.diagram-search-input');
+    var list = widget.querySelector('.diagram-search-results');
+    var indexUrl = widget.getAttribute('data-index');
+    var baseurl = widget.getAttribute('data-baseurl') || '';
+    var docs = null;
+    var shards = {};
+
+    function fetchJson(name) {
+      return fetch(indexUrl + name + '.json').then(function (res) {
+        if (!res.ok) {
+          throw new Error(res.status + ' ' + res.statusText);
+        }
+        return res.json();
+      });
+    }
+
+    function loadDocs() {
+      if (!docs) {
+        docs = fetchJson('docs');
+      }
+      return docs;
+    }
+
+    function loadShard(key, available) {
+      if (available.indexOf(key) === -1) {
+        return Promise.resolve({});
+      }
+      if (!shards[key]) {
+        shards[key] = fetchJson(key);
+      }
+      return shards[key];
+    }
+
+    // Every word must match some indexed term as a prefix; scores add up
+    function search(query) {
+      var words = query.toLowerCase().match(TOKEN) || [];
+      if (!words.length) {
+        return Promise.resolve([]);
+      }
+      return loadDocs().then(function (index) {
+        return Promise.all(words.map(function (word) {
+          return loadShard(word.charAt(0), index.shards);
+        })).then(function (loaded) {
+          var totals = null;
+          words.forEach(function (word, i) {
+            var scores = {};
+            Object.keys(loaded[i]).forEach(function (term) {
+              if (term.lastIndexOf(word, 0) !== 0) {
+                return;
+              }
+              var postings = loaded[i][term];
+              var bonus = term === word ? 2 : 1;
+              for (var p = 0; p < postings.length; p += 2) {
+                scores[postings[p]] = (scores[postings[p]] || 0) + postings[p + 1] * bonus;
+              }
+            });
+            if (totals === null) {
+              totals = scores;
+              return;
+            }
+            Object.keys(totals).forEach(function (doc) {
+              if (scores[doc]) {
+                totals[doc] += scores[doc];
+              } else {
+                delete totals[doc];
+              }
+            });
+          });
+          return Object.keys(totals).sort(function (a, b) {
+            return totals[b] - totals[a] || a - b;
+          }).slice(0, MAX_RESULTS).map(function (doc) {
+            return index.docs[doc];
+          });
+        });
+      });
+    }
+
+    function show(results, query) {
+      list.innerHTML = '';
+      results.forEach(function (doc) {
+        var item = document.createElement('li');
+        var link = document.createElement('a');
+        link.href = baseurl + doc[1];
+        link.textContent = doc[0];
+        var category = document.createElement('span');
+        category.className = 'diagram-search-category';
+        category.textContent = doc[2];
+        item.appendChild(link);
+        item.appendChild(category);
+        list.appendChild(item);
+      });
+      if (!results.length && query.trim()) {
+        var empty = document.createElement('li');
+        empty.textContent = 'No matching diagrams';
+        list.appendChild(empty);
+      }
+    }
+
+    var latest = 0;
+    input.addEventListener('focus', loadDocs, { once: true });
+    input.addEventListener('input', function () {
+      var query = input.value;
+      var ticket = ++latest;
+      search(query).then(function (results) {
+        // Ignore answers to queries the user has already typed past
+        if (ticket === latest) {
+          show(results, query);
+        }
+      }).catch(function () {
+        if (ticket === latest) {
+          list.innerHTML = '<li>Search is unavailable right now</li>';
+        }
+      });
+    });
+  }
+
+  var widgets = document.querySelectorAll('.diagram-search');
+  for (var i = 0; i < widgets.length; i++) {
+    init(widgets[i]);
+  }
+})();
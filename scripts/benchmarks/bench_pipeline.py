@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Benchmark the diagram pipeline on a synthetic catalog
+Generates N .drawio files (several pages each, large mxGraph payloads, a mix
+of compressed and plain pages, with metadata sidecars) in a temporary
+project tree, then times every stage and records its peak memory.
+
+Usage:
+  python3 scripts/benchmarks/bench_pipeline.py --diagrams 1000 --pages 3 --cells 400
+  python3 scripts/benchmarks/bench_pipeline.py --compare bench-results/old.json
+
+Results are written as JSON (default bench-results/<commit>-<time>.json) so
+runs can be compared between commits. Rendering and export stages run on a
+--render-sample of the catalog because they dominate the run time.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import base64
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import importlib.util
+from pathlib import Path
+from urllib.parse import quote
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import drawio_render
+import exports
+from conversion_manifest import ConversionManifest, file_hash
+
+SHAPES = [
+    "rounded=1;whiteSpace=wrap;html=1;fillColor=#dae8fc;strokeColor=#6c8ebf;",
+    "ellipse;whiteSpace=wrap;html=1;fillColor=#d5e8d4;strokeColor=#82b366;",
+    "rhombus;whiteSpace=wrap;html=1;fillColor=#fff2cc;strokeColor=#d6b656;",
+    "shape=cylinder3;whiteSpace=wrap;html=1;fillColor=#f8cecc;strokeColor=#b85450;",
+    "swimlane;whiteSpace=wrap;html=1;fillColor=#e1d5e7;strokeColor=#9673a6;",
+    "text;html=1;align=center;verticalAlign=middle;fontStyle=1;",
+]
+EDGE_STYLE = "edgeStyle=orthogonalEdgeStyle;rounded=0;html=1;endArrow=block;"
+CATEGORIES = ["System Architecture", "Security", "DevOps", "Data Flow", "Networking",
+              "Observability", "Storage", "Identity"]
+TAGS = ["AWS", "Fargate", "RDS", "VPC", "WAF", "GitLab", "CI/CD", "Kafka", "Lambda",
+        "S3", "CloudFront", "EKS", "Terraform", "Monitoring", "IAM", "Redis"]
+WORDS = ["service", "gateway", "cluster", "queue", "worker", "cache", "database",
+         "pipeline", "stage", "monitor", "balancer", "bucket", "function", "stream"]
+
+
+# -- synthetic catalog -------------------------------------------------------
+
+def synthetic_model(rng, cells):
+    """mxGraphModel XML with a grid of labelled vertices joined by edges"""
+    columns = max(1, int(cells ** 0.5))
+    parts = ['<mxGraphModel dx="1200" dy="800" grid="1" gridSize="10"><root>',
+             '<mxCell id="0"/><mxCell id="1" parent="0"/>']
+    for n in range(cells):
+        x, y = (n % columns) * 180 + 20, (n // columns) * 110 + 20
+        label = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        parts.append(f'<mxCell id="v{n}" value="{label}" style="{rng.choice(SHAPES)}" '
+                     f'vertex="1" parent="1"><mxGeometry x="{x}" y="{y}" width="140" '
+                     f'height="60" as="geometry"/></mxCell>')
+        if n and n % columns:
+            parts.append(f'<mxCell id="e{n}" style="{EDGE_STYLE}" edge="1" parent="1" '
+                         f'source="v{n - 1}" target="v{n}"><mxGeometry relative="1" '
+                         f'as="geometry"/></mxCell>')
+    parts.append('</root></mxGraphModel>')
+    return "".join(parts)
+
+
+def compress(xml):
+    """draw.io's compressed page encoding: URI-encode, raw deflate, base64"""
+    deflater = zlib.compressobj(9, zlib.DEFLATED, -15)
+    data = deflater.compress(quote(xml, safe="").encode('ascii')) + deflater.flush()
+    return base64.b64encode(data).decode('ascii')
+
+
+def write_catalog(root, diagrams, pages, cells, compressed_ratio, seed):
+    """Write the synthetic .drawio files and sidecars; returns total bytes"""
+    rng = random.Random(seed)
+    source_dir = root / "40-resources" / "diagrams"
+    source_dir.mkdir(parents=True)
+    total = 0
+    for number in range(diagrams):
+        stem = f"{number:05d}-synthetic-{rng.choice(WORDS)}"
+        body = []
+        for page in range(pages):
+            model = synthetic_model(rng, cells)
+            if rng.random() < compressed_ratio:
+                body.append(f'<diagram id="p{page}" name="Page-{page + 1}">{compress(model)}</diagram>')
+            else:
+                body.append(f'<diagram id="p{page}" name="Page-{page + 1}">{model}</diagram>')
+        path = source_dir / f"{stem}.drawio"
+        path.write_text(f'<mxfile host="benchmark">{"".join(body)}</mxfile>', encoding='utf-8')
+        total += path.stat().st_size
+        tags = rng.sample(TAGS, rng.randint(2, 5))
+        (source_dir / f"{stem}.meta.yml").write_text(
+            f"title: Synthetic {stem.title()}\n"
+            f"description: Generated {' '.join(rng.choice(WORDS) for _ in range(12))}.\n"
+            f"category: {rng.choice(CATEGORIES)}\n"
+            f"complexity: {rng.choice(['Low', 'Medium', 'High'])}\n"
+            f"tags: {json.dumps(tags)}\n", encoding='utf-8')
+    return total
+
+
+# -- measurement -------------------------------------------------------------
+
+def measure(results, name, func, items, trace_memory=True, silence=False):
+    """Run func once, recording wall time and peak traced memory"""
+    stdout = sys.stdout
+    if silence:
+        # The converters and the index generator print a line per diagram
+        sys.stdout = open(os.devnull, 'w')
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        value = func()
+    finally:
+        seconds = time.perf_counter() - started
+        if silence:
+            sys.stdout.close()
+            sys.stdout = stdout
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    results.append({
+        'stage': name,
+        'seconds': round(seconds, 4),
+        'items': items,
+        'ms_per_item': round(seconds * 1000 / items, 3) if items else None,
+        'peak_bytes': peak,
+    })
+    peak_text = f", peak {peak / 1e6:.1f} MB" if peak is not None else ""
+    print(f"  {name:<28} {seconds:8.3f}s  ({items} items{peak_text})")
+    return value
+
+
+def load_script(name):
+    """Import a hyphenated script from scripts/ as a module"""
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), SCRIPTS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# -- stages ------------------------------------------------------------------
+
+def run(args):
+    results = []
+    trace = not args.no_tracemalloc
+    workdir = Path(tempfile.mkdtemp(prefix="diagram-bench-"))
+    previous_dir = os.getcwd()
+    try:
+        print(f"Generating {args.diagrams} diagrams x {args.pages} pages x {args.cells} cells...")
+        catalog_bytes = write_catalog(workdir, args.diagrams, args.pages, args.cells,
+                                      args.compressed, args.seed)
+        print(f"  catalog size {catalog_bytes / 1e6:.1f} MB in {workdir}")
+        source_dir = workdir / "40-resources" / "diagrams"
+        sources = sorted(source_dir.glob("*.drawio"))
+        sample = sources[:args.render_sample]
+        png_dir = workdir / "diagrams" / "assets" / "png"
+        png_dir.mkdir(parents=True)
+
+        def parse_all():
+            pages = 0
+            for source in sources:
+                for _ in drawio_render.iter_pages(source):
+                    pages += 1
+            return pages
+        measure(results, "parse pages (iter_pages)", parse_all, len(sources) * args.pages, trace)
+
+        digests = measure(results, "hash sources",
+                          lambda: {source: file_hash(source) for source in sources},
+                          len(sources), trace)
+
+        def layout_svg():
+            for source in sample:
+                for _, model in drawio_render.iter_pages(source):
+                    drawio_render.render_svg(model)
+        measure(results, "layout + SVG", layout_svg, len(sample) * args.pages, trace)
+
+        converter = load_script("convert-drawio-simple")
+        no_exports = {'formats': [], 'widths': [], 'thumbs': None}
+
+        def convert():
+            for source in sample:
+                converter.convert_diagram(source, png_dir, 'native', no_exports)
+        measure(results, "convert (native, all pages)", convert, len(sample), trace, silence=True)
+
+        def export():
+            for source in sample:
+                exports.write_exports(png_dir / f"{source.stem}.png", png_dir.parent, source.stem)
+        measure(results, "exports (formats + widths)", export, len(sample), trace, silence=True)
+
+        def manifest_check():
+            manifest = ConversionManifest(png_dir, {'benchmark': True})
+            for source in sources:
+                manifest.record(source, [], digests[source])
+            manifest.save()
+            manifest = ConversionManifest(png_dir, {'benchmark': True})
+            return sum(manifest.is_current(source, [], digests[source]) for source in sources)
+        measure(results, "manifest record + check", manifest_check, len(sources), trace)
+
+        # generate-diagram-index.py works relative to the project root
+        os.chdir(workdir)
+        index = load_script("generate-diagram-index")
+        index.ensure_directories()
+        diagrams = measure(results, "scan_diagrams (cold cache)",
+                           lambda: scan(index), len(sources), trace)
+        measure(results, "scan_diagrams (warm cache)", lambda: scan(index), len(sources), trace)
+        categories, tags = index.summarize_catalog(diagrams)
+        measure(results, "generate_individual_pages",
+                lambda: index.generate_individual_pages(diagrams, categories, tags),
+                len(diagrams), trace)
+        measure(results, "write_catalog",
+                lambda: index.write_catalog(diagrams), len(diagrams), trace, silence=True)
+    finally:
+        os.chdir(previous_dir)
+        if not args.keep:
+            shutil.rmtree(workdir)
+    return results
+
+
+def scan(index):
+    store = index.MetadataStore(index.DIAGRAM_SOURCE_DIR)
+    diagrams = index.scan_diagrams(store)
+    store.save()
+    return diagrams
+
+
+def compare(current, baseline_path, traced):
+    """Print per-stage deltas against an earlier results file"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    baseline = {row['stage']: row for row in data['stages']}
+    print(f"\nCompared with {baseline_path} ({data.get('commit', 'unknown')}):")
+    if data.get('tracemalloc') != traced:
+        print("  ⚠️  only one of the runs traced memory, timings are not comparable")
+    for row in current:
+        old = baseline.get(row['stage'])
+        if not old or not old['seconds']:
+            continue
+        change = (row['seconds'] - old['seconds']) / old['seconds'] * 100
+        print(f"  {row['stage']:<28} {old['seconds']:8.3f}s -> {row['seconds']:8.3f}s ({change:+.0f}%)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the diagram pipeline")
+    parser.add_argument('--diagrams', type=int, default=200, help="number of .drawio files")
+    parser.add_argument('--pages', type=int, default=2, help="pages per file")
+    parser.add_argument('--cells', type=int, default=200, help="vertices per page")
+    parser.add_argument('--compressed', type=float, default=0.5,
+                        help="fraction of pages stored compressed (0-1)")
+    parser.add_argument('--render-sample', type=int, default=10,
+                        help="diagrams used for the rendering and export stages")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="results file (default bench-results/<commit>-<time>.json)")
+    parser.add_argument('--compare', metavar='FILE', help="earlier results to compare against")
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help="skip memory tracing for lower-overhead timings")
+    parser.add_argument('--keep', action='store_true', help="keep the generated catalog")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = run(args)
+    commit = git_commit()
+    output = Path(args.output or SCRIPTS_DIR.parent / "bench-results" /
+                  f"{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'parameters': {key: value for key, value in vars(args).items()
+                           if key not in ('output', 'compare', 'keep')},
+            'tracemalloc': not args.no_tracemalloc,
+            'stages': stages,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(stages, args.compare, not args.no_tracemalloc)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
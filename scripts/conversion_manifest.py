@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Conversion manifest for incremental diagram builds
+Records the content hash of every .drawio source and the converter settings
+used for it, so unchanged diagrams are skipped on the next run
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+MANIFEST_NAME = ".conversion-manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_hash(settings):
+    """Stable hash of a converter settings dict"""
+    encoded = json.dumps(settings, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ConversionManifest:
+    """Tracks which outputs were produced from which source and settings"""
+
+    def __init__(self, output_dir, settings):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_NAME
+        self.settings = settings_hash(settings)
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('entries', {})
+
+    def is_current(self, source, outputs, source_digest=None):
+        """True when source and settings are unchanged and all outputs exist"""
+        entry = self.entries.get(Path(source).stem)
+        if entry is None or entry.get('settings') != self.settings:
+            return False
+        if any(not Path(output).exists() for output in outputs):
+            return False
+        return entry.get('source') == (source_digest or file_hash(source))
+
+    def record(self, source, outputs, source_digest=None):
+        """Remember the outputs written for source
+
+        Outputs recorded last time but not produced now (a page that was
+        removed from the diagram, say) are deleted.
+        """
+        stem = Path(source).stem
+        names = sorted(self._relative(output) for output in outputs
+                       if Path(output).exists())
+        previous = self.entries.get(stem, {}).get('outputs', [])
+        for name in set(previous) - set(names):
+            self._remove(name)
+        self.entries[stem] = {
+            'source': source_digest or file_hash(source),
+            'settings': self.settings,
+            'outputs': names,
+        }
+
+    def _relative(self, output):
+        """Output path relative to the manifest directory, POSIX style"""
+        return Path(os.path.relpath(output, self.output_dir)).as_posix()
+
+    def prune(self, sources):
+        """Delete outputs of diagrams whose source no longer exists"""
+        live = {Path(source).stem for source in sources}
+        removed = []
+        for stem in sorted(set(self.entries) - live):
+            for name in self.entries.pop(stem).get('outputs', []):
+                output = self._remove(name)
+                if output is not None:
+                    removed.append(output)
+        return removed
+
+    def _remove(self, name):
+        """Delete a recorded output; returns its path if it existed"""
+        output = self.output_dir / name
+        if not output.exists():
+            return None
+        output.unlink()
+        return output
+
+    def save(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries},
+                      f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Output layout shared by the diagram converters
+Names the files a conversion writes (per-page PNG and SVG, exports and
+thumbnails) so both converters, and the manifest checks in front of them,
+agree on where everything goes
+"""
+
+from pathlib import Path
+
+import drawio_render
+import exports
+import thumbnails
+
+
+def svg_dir(output_dir):
+    """SVGs live next to the PNG directory"""
+    return Path(output_dir).parent / "svg"
+
+
+def iter_page_outputs(drawio_file, output_dir):
+    """Yield (page name, mxGraphModel, png path, svg path) for every page
+
+    Pages are streamed with drawio_render.iter_pages, one in memory at a
+    time; the first page keeps the diagram's name (see page_stem).
+    """
+    stem = Path(drawio_file).stem
+    for index, (page_name, model) in enumerate(drawio_render.iter_pages(drawio_file)):
+        name = drawio_render.page_stem(stem, index)
+        yield (page_name, model, Path(output_dir) / f"{name}.png",
+               svg_dir(output_dir) / f"{name}.svg")
+
+
+def diagram_outputs(drawio_file, output_dir, renderer, export):
+    """Files every conversion produces (pages and responsive widths add more)"""
+    stem = Path(drawio_file).stem
+    outputs = [Path(output_dir) / f"{stem}.png"]
+    outputs += exports.export_paths(Path(output_dir).parent, stem, export['formats'])
+    outputs += thumbnails.thumbnail_paths(output_dir, stem, *export['thumbs'])
+    if renderer == 'native':
+        outputs.append(svg_dir(output_dir) / f"{stem}.svg")
+    return outputs
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Process pool runner for diagram conversion
+Runs one conversion task per diagram and isolates failures, so a single
+broken diagram never stops the rest of the batch
+"""
+
+import io
+import os
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import DISABLED, now_us
+
+
+def resolve_jobs(jobs):
+    """Map a --jobs value to a worker count (0 means one per CPU)"""
+    if jobs is None or jobs < 0:
+        return 1
+    return jobs or os.cpu_count() or 1
+
+
+def _run_captured(func, task):
+    """Call func(*task), capturing what it prints, any exception and its timing"""
+    buffer = io.StringIO()
+    start = now_us()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            result, error = func(*task), None
+        except Exception as e:
+            result, error = None, e
+    return result, buffer.getvalue(), error, (start, now_us() - start, os.getpid())
+
+
+def _traced(tracer, func, task, outcome):
+    result, output, error, (start, duration, pid) = outcome
+    tracer.record(os.path.basename(str(task[0])), start, duration, cat=func.__name__,
+                  pid=pid, failed=error is not None)
+    return task, result, output, error
+
+
+def run_tasks(func, tasks, jobs=1, tracer=DISABLED):
+    """Yield (task, result, output, error) for each argument tuple in input order
+
+    With jobs == 1 the tasks run in this process; otherwise they are spread
+    over a process pool. Each task's printed output is returned rather than
+    interleaved, and exceptions are returned per task, never raised. Every
+    task's run time is reported to tracer, attributed to its worker process.
+    """
+    jobs = resolve_jobs(jobs)
+    tasks = list(tasks)
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _traced(tracer, func, task, _run_captured(func, task))
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        futures = [(task, pool.submit(_run_captured, func, task)) for task in tasks]
+        for task, future in futures:
+            try:
+                yield _traced(tracer, func, task, future.result())
+            except Exception as e:
+                # The worker itself died (e.g. BrokenProcessPool)
+                yield task, None, "", e
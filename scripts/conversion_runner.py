@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Command line and batch loop shared by the diagram converters
+Each converter supplies its own convert_diagram and renderer choices; this
+module parses the common options, skips diagrams the manifest says are
+current, converts the rest through the process pool and prunes outputs
+whose source is gone
+"""
+
+import argparse
+from pathlib import Path
+
+from conversion_manifest import ConversionManifest, file_hash
+from conversion_outputs import diagram_outputs
+from conversion_pool import run_tasks
+import instrumentation
+import thumbnails
+import exports
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_ROOT / "40-resources" / "diagrams"
+OUTPUT_DIR = PROJECT_ROOT / "diagrams" / "assets" / "png"
+
+
+def parse_args(argv=None, renderers=('native', 'placeholder'), renderer_help=None):
+    """Parse the converter options; renderers[0] is the default renderer"""
+    parser = argparse.ArgumentParser(description="Convert .drawio diagrams to PNG")
+    parser.add_argument('--force', action='store_true',
+                        help="reconvert every diagram, ignoring the manifest")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="convert N diagrams in parallel (0 = one per CPU)")
+    parser.add_argument('--only', action='append', metavar='NAME',
+                        help="convert only this diagram (file name without .drawio), repeatable")
+    parser.add_argument('--export-format', choices=exports.FORMATS + ['none'], action='append',
+                        dest='export_formats',
+                        help="extra format to publish, repeatable (default: all; none to skip)")
+    parser.add_argument('--width', type=int, action='append', dest='widths', metavar='PX',
+                        help="responsive width for srcset, repeatable (default 480, 960, 1600)")
+    parser.add_argument('--thumb-size', type=thumbnails.parse_size, action='append',
+                        metavar='WxH', dest='thumb_sizes',
+                        help="thumbnail box, repeat for more sizes (default 300x200)")
+    parser.add_argument('--thumb-format', choices=thumbnails.FORMATS, action='append',
+                        dest='thumb_formats', help="thumbnail encoding, repeatable (default png)")
+    parser.add_argument('--renderer', choices=list(renderers), default=renderers[0],
+                        help=renderer_help)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    args.thumb_sizes = args.thumb_sizes or thumbnails.DEFAULT_SIZES
+    args.thumb_formats = args.thumb_formats or ['png']
+    args.export_formats = [fmt for fmt in args.export_formats or exports.FORMATS if fmt != 'none']
+    args.widths = args.widths or exports.DEFAULT_WIDTHS
+    return args
+
+
+def convert_all(args, settings, convert_diagram, tracer, prepare=None):
+    """Convert every stale diagram under SOURCE_DIR into OUTPUT_DIR
+
+    settings describes everything that changes the generated images; it is
+    part of the manifest key, so editing it forces a full rebuild.
+    convert_diagram(drawio_file, output_dir, renderer, export, ...) returns
+    (files written, complete) or False, and a diagram is only recorded in
+    the manifest when complete. prepare(stale, args, tracer), if given, may
+    rewrite the stale task list before conversion or return None to abort.
+    Returns (converted, up to date, total), or None when nothing could run.
+    """
+    if not SOURCE_DIR.exists():
+        print(f"Error: Source directory {SOURCE_DIR} does not exist")
+        return None
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    export = {
+        'formats': args.export_formats,
+        'widths': args.widths,
+        'thumbs': (args.thumb_sizes, args.thumb_formats),
+    }
+    manifest = ConversionManifest(OUTPUT_DIR, dict(settings, renderer=args.renderer,
+                                                   export=export))
+    sources = sorted(SOURCE_DIR.glob("*.drawio"))
+    # --only narrows the work; pruning still sees every source
+    selected = [source for source in sources if not args.only or source.stem in args.only]
+
+    digests = {}
+    stale = []
+    with tracer.stage("check manifest", diagrams=len(selected)):
+        for drawio_file in selected:
+            digests[drawio_file] = file_hash(drawio_file)
+            outputs = diagram_outputs(drawio_file, OUTPUT_DIR, args.renderer, export)
+            if args.force or not manifest.is_current(drawio_file, outputs, digests[drawio_file]):
+                stale.append((drawio_file, OUTPUT_DIR, args.renderer, export))
+
+    if prepare and stale:
+        stale = prepare(stale, args, tracer)
+        if stale is None:
+            return None
+
+    # Results come back in source order, so output matches a sequential run
+    stale_files = {task[0] for task in stale}
+    results = run_tasks(convert_diagram, stale, args.jobs, tracer)
+
+    converted = skipped = 0
+    with tracer.stage("convert", diagrams=len(stale), jobs=args.jobs):
+        for drawio_file in selected:
+            if drawio_file not in stale_files:
+                converted += 1
+                skipped += 1
+                print(f"Up to date: {drawio_file.name}")
+                continue
+
+            _, ok, output, error = next(results)
+            print(output, end="")
+            if error is not None:
+                tracer.count("failed")
+                print(f"  ✗ Failed: {drawio_file.name} ({error})")
+            elif ok:
+                files, complete = ok
+                converted += 1
+                tracer.count("outputs written", len(files))
+                # Placeholders standing in for a failed render are retried next run
+                if complete:
+                    manifest.record(drawio_file, files, digests[drawio_file])
+
+    with tracer.stage("prune"):
+        for orphan in manifest.prune(sources):
+            tracer.count("orphans removed")
+            print(f"Removed orphaned asset: {orphan.name}")
+        manifest.save()
+
+    tracer.count("up to date", skipped)
+    return converted, skipped, len(selected)
@@ -8,10 +8,29 @@ No paid plugins required
 import os
 import sys
 import json
-import base64
+import tempfile
 from pathlib import Path
 import subprocess
 
+from conversion_outputs import iter_page_outputs, svg_dir
+from conversion_pool import resolve_jobs
+import conversion_runner
+import drawio_render
+import instrumentation
+import exports
+
+# Manifest key settings (see conversion_runner.convert_all)
+CONVERTER_SETTINGS = {
+    'converter': 'convert-drawio-free',
+    'size': [1200, 900],
+    'native_renderer': drawio_render.RENDERER_VERSION,
+}
+
+BATCH_RENDERER = Path(__file__).parent / "render-drawio-batch.js"
+# Local copy of the draw.io viewer, downloaded by `npm run fetch-drawio-viewer`
+VIEWER_JS = os.getenv("DRAWIO_VIEWER_JS",
+                      str(Path(__file__).parent / "drawio-viewer" / "viewer-static.min.js"))
+
 def check_dependencies():
     """Check if required free tools are available"""
     print("Checking free and open-source dependencies...")
@@ -60,54 +79,51 @@ def install_free_tools():
     
     return True
 
-def convert_drawio_with_playwright(input_file, output_path):
-    """Convert draw.io file using free Playwright browser automation"""
-    try:
-        # Create a simple Node.js script for conversion
-        script_content = f"""
-const {{ chromium }} = require('playwright');
-const fs = require('fs');
-
-(async () => {{
-    const browser = await chromium.launch();
-    const page = await browser.newPage();
-    
-    // Read draw.io file
-    const drawioContent = fs.readFileSync('{input_file}', 'utf8');
-    const encoded = encodeURIComponent(drawioContent);
+def convert_drawio_batch(jobs, pages=1, timeout=30000):
+    """Render many draw.io files with one headless browser and a page pool
     
-    // Load in draw.io viewer
-    await page.goto(`https://viewer.diagrams.net/?lightbox=1&highlight=0000ff&edit=_blank&layers=1&nav=1&title=diagram#R${{encoded}}`);
+    jobs is a list of (input_file, output_path) pairs. The viewer is served
+    locally from VIEWER_JS instead of viewer.diagrams.net. The viewer has no
+    render-complete event, so each screenshot is taken once two animation
+    frames have passed and fonts and images have loaded (a heuristic, but
+    no fixed sleep). Returns {input_file: error or None}; every job missing
+    from the batch output is reported as failed.
+    """
+    if not jobs:
+        return {}
     
-    // Wait for diagram to render
-    await page.waitForTimeout(3000);
-    
-    // Take screenshot
-    await page.screenshot({{
-        path: '{output_path}',
-        fullPage: true,
-        type: 'png'
-    }});
+    config = {
+        'viewer': str(Path(VIEWER_JS).resolve()),
+        'pages': pages,
+        'timeout': timeout,
+        'jobs': [{'input': str(input_file), 'output': str(output_path)}
+                 for input_file, output_path in jobs],
+    }
+    results = {str(input_file): "not rendered" for input_file, _ in jobs}
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(config, f)
+        config_path = f.name
+    try:
+        proc = subprocess.run(['node', str(BATCH_RENDERER), config_path],
+                              capture_output=True, text=True)
+        for line in proc.stdout.splitlines():
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            results[result['input']] = None if result['ok'] else result['error']
+        if proc.returncode != 0:
+            errors = [line.strip() for line in proc.stderr.splitlines() if 'Error' in line]
+            error = errors[0] if errors else f"renderer exited with code {proc.returncode}"
+            for input_file, outcome in results.items():
+                if outcome == "not rendered":
+                    results[input_file] = error
+    except OSError as e:
+        results = {input_file: str(e) for input_file in results}
+    finally:
+        os.remove(config_path)
     
-    await browser.close();
-}})();
-"""
-        
-        # Write temporary script
-        script_path = '/tmp/convert_drawio.js'
-        with open(script_path, 'w') as f:
-            f.write(script_content)
-        
-        # Execute with Node.js
-        subprocess.run(['node', script_path], check=True)
-        
-        # Clean up
-        os.remove(script_path)
-        
-        return True
-    except Exception as e:
-        print(f"  ✗ Playwright conversion failed: {e}")
-        return False
+    return results
 
 def create_placeholder_with_message(output_path, title):
     """Create a helpful placeholder image with instructions"""
@@ -179,67 +195,133 @@ Source: {os.path.basename(output_path).replace('.png', '.drawio')}
 """)
         return True
 
-def main():
+def convert_natively(drawio_file, output_dir):
+    """Render every page with the built-in renderer; None means fall back"""
+    written = []
+    try:
+        svg_dir(output_dir).mkdir(parents=True, exist_ok=True)
+        for _, model, png_path, svg_path in iter_page_outputs(drawio_file, output_dir):
+            written += drawio_render.render_to_files(model, svg_path, png_path)
+    except Exception as e:
+        print(f"   ⚠️  Native rendering failed: {e} (using placeholder)")
+        return None
+    if not written:
+        print("   ⚠️  No pages found (using placeholder)")
+        return None
+    for path in written:
+        print(f"   ✅ Created: {path.name}")
+    if output_dir / f"{drawio_file.stem}.png" not in written:
+        print("   ⚠️  Pillow not installed, PNG falls back to placeholder")
+        return None
+    return written
+
+def convert_diagram(drawio_file, output_dir, renderer='native', export=None, rendered=False):
+    """Convert one diagram and its exports (runs in a worker with --jobs)
+    
+    export holds the formats, widths and thumbnail settings. rendered
+    means the batch renderer already wrote the full-size PNG.
+    The native renderer writes every page. Returns (files written,
+    complete), or False on failure; complete is False when a placeholder
+    stands in for a render that failed.
+    """
+    base_name = drawio_file.stem
+    output_path = output_dir / f"{base_name}.png"
+    
+    title = base_name.replace("-", " ").title()
+    written = [output_path]
+    
+    print(f"\n📊 {base_name}")
+    print(f"   Source: {drawio_file.name}")
+    
+    if renderer == 'native':
+        pages = convert_natively(drawio_file, output_dir)
+        rendered = pages is not None
+        written = pages or written
+    elif rendered:
+        print(f"   ✅ Created: {output_path.name}")
+    
+    # Without a real render, create a helpful placeholder instead
+    if rendered or create_placeholder_with_message(str(output_path), title):
+        if not rendered:
+            print(f"   ✅ Created: {output_path.name}")
+        
+        # Other formats, widths and thumbnails come from the full image in one pass
+        export = export or {}
+        export_paths = exports.write_exports(output_path, output_dir.parent, base_name,
+                                             export.get('formats'), export.get('widths'),
+                                             export.get('thumbs'))
+        print(f"   ✅ Exported {len(export_paths)} derived files")
+        return written + export_paths, rendered or renderer == 'placeholder'
+    
+    print(f"   ❌ Failed: {drawio_file.name}")
+    return False
+
+def render_batch(stale, args, tracer):
+    """Render the stale diagrams with one headless browser before conversion
+    
+    Appends a rendered flag to every task; returns None when the browser
+    side is broken, so no placeholders overwrite the published images.
+    """
+    if not Path(VIEWER_JS).exists():
+        print(f"\n❌ Error: draw.io viewer not found at {VIEWER_JS}")
+        print("Run: npm run fetch-drawio-viewer (or set DRAWIO_VIEWER_JS)")
+        return None
+    print(f"\n🌐 Rendering {len(stale)} diagram(s) with one headless browser...")
+    with tracer.stage("playwright batch", diagrams=len(stale)):
+        errors = convert_drawio_batch(
+            [(drawio_file, output_dir / f"{drawio_file.stem}.png")
+             for drawio_file, output_dir, *_ in stale],
+            pages=resolve_jobs(args.jobs),
+        )
+    if all(errors.values()):
+        # Nothing rendered: the browser side is broken, not one diagram
+        print(f"\n❌ Error: the headless renderer failed for every diagram: "
+              f"{next(iter(errors.values()))}")
+        print("Check that Playwright and Chromium are installed (npx playwright install chromium)")
+        return None
+    for drawio_file, *_ in stale:
+        if errors.get(str(drawio_file)):
+            tracer.count("playwright fallbacks")
+            print(f"   ⚠️  {drawio_file.name}: {errors[str(drawio_file)]} (using placeholder)")
+    return [task + (not errors.get(str(task[0])),) for task in stale]
+
+def main(argv=None):
     """Main conversion with free and open-source tools"""
+    args = conversion_runner.parse_args(
+        argv, ['native', 'placeholder', 'playwright'],
+        "render with the built-in renderer, one shared headless browser, "
+        "or write placeholders")
     print("=" * 70)
     print("FREE AND OPEN-SOURCE DIAGRAM CONVERTER")
     print("=" * 70)
     print("Using: Playwright (free), Mermaid CLI (free), No paid plugins")
     print("=" * 70)
     
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    
-    diagram_source_dir = project_root / "40-resources" / "diagrams"
-    output_dir = project_root / "diagrams" / "assets" / "png"
-    
-    if not diagram_source_dir.exists():
-        print(f"\n❌ Error: Source directory {diagram_source_dir} not found")
-        return False
-    
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
+    tracer = instrumentation.from_args('convert-drawio-free', args)
     
     # Check dependencies
-    if not check_dependencies():
+    with tracer.stage("check dependencies"):
+        dependencies_ok = check_dependencies()
+    if not dependencies_ok:
         print("\n⚠️  Some dependencies are missing.")
         print("Run: npm install -g playwright mermaid.cli")
         print("Then: playwright install chromium")
     
-    success_count = 0
-    total_count = 0
-    
     # Process all .drawio files
     print("\n" + "=" * 70)
     print("PROCESSING DIAGRAMS")
     print("=" * 70)
     
-    for drawio_file in sorted(diagram_source_dir.glob("*.drawio")):
-        total_count += 1
-        base_name = drawio_file.stem
-        output_path = output_dir / f"{base_name}.png"
-        
-        print(f"\n📊 {base_name}")
-        print(f"   Source: {drawio_file.name}")
-        
-        # Try Playwright conversion (free)
-        title = base_name.replace("-", " ").title()
-        
-        # For now, create helpful placeholders
-        # In CI/CD, Playwright will do actual conversion
-        if create_placeholder_with_message(str(output_path), title):
-            success_count += 1
-            print(f"   ✅ Created: {output_path.name}")
-            
-            # Create thumbnail
-            thumb_path = output_dir / f"{base_name}_thumb.png"
-            create_placeholder_with_message(str(thumb_path), f"{title} (Thumbnail)")
-            print(f"   ✅ Created: {thumb_path.name}")
-        else:
-            print(f"   ❌ Failed: {drawio_file.name}")
+    counts = conversion_runner.convert_all(
+        args, CONVERTER_SETTINGS, convert_diagram, tracer,
+        prepare=render_batch if args.renderer == 'playwright' else None)
+    if counts is None:
+        tracer.finish()
+        return False
     
+    success_count, skipped_count, total_count = counts
     print("\n" + "=" * 70)
-    print(f"SUMMARY: {success_count}/{total_count} diagrams processed")
+    print(f"SUMMARY: {success_count}/{total_count} diagrams processed ({skipped_count} up to date)")
     print("=" * 70)
     print("\n💡 TIP: For high-quality conversions in CI/CD:")
     print("   • GitHub Actions will use free Playwright automation")
@@ -247,6 +329,7 @@ def main():
     print("   • Edit .drawio files anytime in VS Code (free extension)")
     print("\n✅ All tools used are FREE and OPEN-SOURCE!")
     
+    tracer.finish()
     return success_count > 0
 
 if __name__ == "__main__":
@@ -6,57 +6,24 @@ This works better in CI environments than the CLI tools
 
 import os
 import sys
-import json
-import base64
-import requests
-from pathlib import Path
-from urllib.parse import quote
 import xml.etree.ElementTree as ET
 
-def extract_drawio_content(file_path):
-    """Extract the diagram content from a .drawio file"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Parse XML to extract the diagram data
-        root = ET.fromstring(content)
-        
-        # Find the diagram element
-        diagram_elem = root.find('.//diagram')
-        if diagram_elem is not None:
-            # Get the text content (which is base64 encoded)
-            diagram_data = diagram_elem.text
-            if diagram_data:
-                # Decode base64 and decompress if needed
-                try:
-                    import zlib
-                    import urllib.parse
-                    
-                    # First URL decode
-                    decoded = urllib.parse.unquote(diagram_data)
-                    # Then base64 decode
-                    b64_decoded = base64.b64decode(decoded)
-                    # Then decompress
-                    decompressed = zlib.decompress(b64_decoded, -15).decode('utf-8')
-                    return decompressed
-                except:
-                    return diagram_data
-        
-        return content
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return None
+from conversion_outputs import iter_page_outputs
+import conversion_runner
+import drawio_render
+import instrumentation
+import exports
+
+# Manifest key settings (see conversion_runner.convert_all)
+CONVERTER_SETTINGS = {
+    'converter': 'convert-drawio-simple',
+    'size': [800, 600],
+    'native_renderer': drawio_render.RENDERER_VERSION,
+}
 
 def convert_to_png_online(drawio_content, output_path, title="Diagram"):
     """Convert draw.io content to PNG using draw.io's export API"""
     try:
-        # Encode the content for URL
-        encoded_content = quote(drawio_content)
-        
-        # Use draw.io's export service
-        export_url = f"https://draw.io/export3.html?format=png&embedXml=1&base64=1&xml={encoded_content}"
-        
         # For now, create a placeholder image since the online API has CORS restrictions
         # In a real CI environment, you'd use Puppeteer or similar
         create_placeholder_png(output_path, title)
@@ -163,50 +130,79 @@ def create_placeholder_png(output_path, title):
         
         return True
 
-def main():
-    """Main conversion function"""
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    
-    diagram_source_dir = project_root / "40-resources" / "diagrams"
-    output_dir = project_root / "diagrams" / "assets" / "png"
-    
-    if not diagram_source_dir.exists():
-        print(f"Error: Source directory {diagram_source_dir} does not exist")
+def convert_natively(drawio_content, output_path, svg_path):
+    """Render one page (XML text or mxGraphModel) to SVG and PNG without a browser"""
+    try:
+        os.makedirs(os.path.dirname(svg_path), exist_ok=True)
+        written = drawio_render.render_to_files(drawio_content, svg_path, output_path)
+    except Exception as e:
+        print(f"  ⚠ Native rendering failed ({e}), using placeholder")
         return False
+    if output_path not in written:
+        print("  ⚠ Pillow not installed, PNG falls back to placeholder")
+        return False
+    return True
+
+def convert_diagram(drawio_file, output_dir, renderer='native', export=None):
+    """Convert every page of a diagram plus its exports (runs in a worker with --jobs)
     
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
+    Pages are streamed from the file one at a time. export holds the
+    formats, widths and thumbnail settings for the first page. Returns
+    (files written, complete), or False on failure; complete is False when
+    a placeholder stands in for a page the native renderer could not draw.
+    """
+    base_name = drawio_file.stem
+    title = base_name.replace("-", " ").title()
+    written = []
+    complete = True
     
-    success_count = 0
-    total_count = 0
+    print(f"Processing: {drawio_file.name}")
     
-    # Process all .drawio files
-    for drawio_file in diagram_source_dir.glob("*.drawio"):
-        total_count += 1
-        base_name = drawio_file.stem
-        output_path = output_dir / f"{base_name}.png"
-        
-        print(f"Processing: {drawio_file.name}")
-        
-        # Extract content
-        content = extract_drawio_content(drawio_file)
-        if content:
+    try:
+        for page_name, model, output_path, svg_path in iter_page_outputs(drawio_file, output_dir):
             # Convert to PNG
-            title = base_name.replace("-", " ").title()
-            if convert_to_png_online(content, str(output_path), title):
-                success_count += 1
-                print(f"  ✓ Created: {output_path}")
-                
-                # Create thumbnail
-                thumb_path = output_dir / f"{base_name}_thumb.png"
-                create_placeholder_png(str(thumb_path), f"{title} (Thumbnail)")
+            if renderer == 'native' and convert_natively(model, output_path, svg_path):
+                written.append(svg_path)
+                print(f"  ✓ Rendered: {svg_path.name} ({page_name})")
             else:
-                print(f"  ✗ Failed: {drawio_file.name}")
-        else:
-            print(f"  ✗ Could not read: {drawio_file.name}")
+                # A placeholder is only the finished output when one was asked for
+                complete = complete and renderer != 'native'
+                if not convert_to_png_online(ET.tostring(model, encoding='unicode'),
+                                             str(output_path), f"{title} - {page_name}"):
+                    print(f"  ✗ Failed: {drawio_file.name}")
+                    return False
+            written.append(output_path)
+            print(f"  ✓ Created: {output_path}")
+    except Exception as e:
+        print(f"  ✗ Could not read {drawio_file.name}: {e}")
+        return False
+    
+    if not written:
+        print(f"  ✗ No pages in: {drawio_file.name}")
+        return False
+    
+    # Other formats, widths and thumbnails come from the first page in one pass
+    export = export or {}
+    export_paths = exports.write_exports(output_dir / f"{base_name}.png", output_dir.parent,
+                                         base_name, export.get('formats'), export.get('widths'),
+                                         export.get('thumbs'))
+    print(f"  ✓ Exported {len(export_paths)} derived files")
+    return written + export_paths, complete
+
+def main(argv=None):
+    """Main conversion function"""
+    args = conversion_runner.parse_args(
+        argv, ['native', 'placeholder'],
+        "draw diagrams with the built-in renderer, or write placeholders")
+    tracer = instrumentation.from_args('convert-drawio-simple', args)
+    counts = conversion_runner.convert_all(args, CONVERTER_SETTINGS, convert_diagram, tracer)
+    if counts is None:
+        tracer.finish()
+        return False
     
-    print(f"\nConversion complete: {success_count}/{total_count} files processed")
+    success_count, skipped_count, total_count = counts
+    print(f"\nConversion complete: {success_count}/{total_count} files processed ({skipped_count} up to date)")
+    tracer.finish()
     return success_count > 0
 
 if __name__ == "__main__":
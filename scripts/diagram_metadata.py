@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Diagram metadata store
+Each diagram's title, description, category, complexity and tags live in a
+<name>.meta.yml sidecar next to its .drawio file. Sidecars are parsed
+lazily and the results are cached on disk keyed by mtime and size, so a
+run only re-parses the sidecars that changed
+"""
+
+import os
+import json
+from pathlib import Path
+
+import yaml
+
+SIDECAR_SUFFIX = ".meta.yml"
+CACHE_NAME = ".metadata-cache.json"
+CACHE_VERSION = 1
+FIELDS = ["title", "description", "category", "complexity", "tags"]
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def default_metadata(stem):
+    """Metadata for a diagram without a sidecar"""
+    return {
+        "title": stem.replace("-", " ").title(),
+        "description": f"Architecture diagram: {stem}",
+        "category": "General",
+        "complexity": "Medium",
+        "tags": ["Architecture"],
+    }
+
+
+class MetadataStore:
+    """Sidecar-backed diagram metadata with an mtime-keyed parse cache"""
+
+    def __init__(self, source_dir):
+        self.source_dir = Path(source_dir)
+        self.cache_path = self.source_dir / CACHE_NAME
+        self._cache = None
+        self._loaded = {}
+        self._dirty = False
+
+    def _load_cache(self):
+        if self._cache is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            if data.get('version') != CACHE_VERSION:
+                data = {}
+            self._cache = data.get('entries', {})
+        return self._cache
+
+    def sidecar(self, stem):
+        return self.source_dir / f"{stem}{SIDECAR_SUFFIX}"
+
+    def get(self, stem):
+        """Metadata for one diagram, parsing its sidecar only if it changed"""
+        if stem in self._loaded:
+            return self._loaded[stem]
+        path = self.sidecar(stem)
+        try:
+            stat = path.stat()
+        except OSError:
+            meta = default_metadata(stem)
+        else:
+            key = [stat.st_mtime_ns, stat.st_size]
+            cached = self._load_cache().get(stem)
+            if cached is not None and cached.get('key') == key:
+                meta = cached['meta']
+            else:
+                meta = self._parse(path, stem)
+                self._cache[stem] = {'key': key, 'meta': meta}
+                self._dirty = True
+        self._loaded[stem] = meta
+        return meta
+
+    def _parse(self, path, stem):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.load(f, Loader=YAML_LOADER) or {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: expected a mapping of metadata fields")
+        meta = default_metadata(stem)
+        meta.update({field: data[field] for field in FIELDS if field in data})
+        meta["tags"] = [str(tag) for tag in meta["tags"] or []]
+        return meta
+
+    def stems(self):
+        """Every diagram in the source directory, sorted"""
+        return sorted(path.stem for path in self.source_dir.glob("*.drawio"))
+
+    def save(self):
+        """Persist the parse cache, dropping diagrams that no longer exist"""
+        cache = self._load_cache()
+        live = set(self.stems())
+        for stem in set(cache) - live:
+            del cache[stem]
+            self._dirty = True
+        if not self._dirty:
+            return
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': cache}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
@@ -0,0 +1,951 @@
+#!/usr/bin/env python3
+"""
+Native draw.io renderer (SVG and PNG, no browser)
+Streams the pages of a .drawio file, turns their mxGraph XML into drawing
+primitives, then writes them as SVG or rasterizes them with PIL. Covers
+vertices (rectangles, rounded rectangles, ellipses, rhombi, cylinders,
+hexagons, swimlanes, actors, text), edges (straight, waypoints, orthogonal
+routing, arrows) and labels, plus the common style keys (colors, stroke
+width, dashes, opacity, font styles, alignment). Output is deterministic:
+the same input always gives the same bytes.
+"""
+
+import re
+import math
+import html
+import zlib
+import base64
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote_to_bytes
+from xml.sax.saxutils import escape, quoteattr
+
+# Bump when output changes so conversion manifests rebuild existing diagrams
+RENDERER_VERSION = 1
+
+BORDER = 20
+DEFAULT_FONT_SIZE = 11
+DEFAULT_FONT_FAMILY = "Helvetica"
+LINE_HEIGHT = 1.2
+# Average glyph width as a fraction of the font size, used for wrapping
+CHAR_WIDTH = 0.55
+BOLD_CHAR_WIDTH = 0.6
+ROUNDING_FACTOR = 0.15
+ARROW_SIZE = 6
+# PNG output is drawn at this multiple and downsampled for antialiasing
+SUPERSAMPLE = 2
+
+# Base64 characters decoded per step when inflating a compressed page
+INFLATE_CHUNK = 64 * 1024
+
+FONT_BOLD = 1
+FONT_ITALIC = 2
+FONT_UNDERLINE = 4
+
+TAG_RE = re.compile(r"<[^>]+>")
+BREAK_RE = re.compile(r"<br\s*/?>|</div>|</p>|</li>", re.IGNORECASE)
+
+
+def parse_style(style):
+    """Split a draw.io style string into a dict; bare tokens become shape names"""
+    result = {}
+    for token in (style or "").split(";"):
+        token = token.strip()
+        if not token:
+            continue
+        if "=" in token:
+            key, value = token.split("=", 1)
+            result[key] = value
+        elif "shape" not in result:
+            result["shape"] = token
+    return result
+
+
+def label_text(value, is_html):
+    """Plain-text lines of a cell label"""
+    if not value:
+        return []
+    if is_html:
+        value = BREAK_RE.sub("\n", value)
+        value = TAG_RE.sub("", value)
+        value = html.unescape(value)
+    return [line.strip() for line in value.replace("\r", "").split("\n")]
+
+
+def wrap_lines(lines, max_width, font_size, bold):
+    """Greedy word wrap using an average glyph width"""
+    char_width = font_size * (BOLD_CHAR_WIDTH if bold else CHAR_WIDTH)
+    max_chars = max(1, int(max_width / char_width))
+    wrapped = []
+    for line in lines:
+        words = line.split()
+        if not words:
+            wrapped.append("")
+            continue
+        current = words[0]
+        for word in words[1:]:
+            if len(current) + 1 + len(word) <= max_chars:
+                current += " " + word
+            else:
+                wrapped.append(current)
+                current = word
+        wrapped.append(current)
+    return wrapped
+
+
+def color(value, default):
+    if value is None or value == "default":
+        return default
+    if value == "none":
+        return "none"
+    return value
+
+
+def percent(style, key):
+    return float(style[key]) / 100 if key in style else 1.0
+
+
+def make_paint(style, fill, stroke):
+    """Collect the fill/stroke settings of a shape"""
+    width = float(style.get("strokeWidth", 1))
+    dash = None
+    if style.get("dashed") == "1":
+        dash = tuple(float(d) * width for d in style.get("dashPattern", "3 3").split())
+    return {
+        "fill": fill,
+        "stroke": stroke,
+        "width": width,
+        "dash": dash,
+        "fill_opacity": percent(style, "fillOpacity"),
+        "stroke_opacity": percent(style, "strokeOpacity"),
+        "opacity": percent(style, "opacity"),
+    }
+
+
+class Cell:
+    """One mxCell with its style and geometry"""
+
+    def __init__(self, elem):
+        self.id = elem.get("id")
+        self.parent = elem.get("parent")
+        self.value = elem.get("value", "")
+        self.style = parse_style(elem.get("style"))
+        self.vertex = elem.get("vertex") == "1"
+        self.edge = elem.get("edge") == "1"
+        self.source = elem.get("source")
+        self.target = elem.get("target")
+        self.geometry = None
+        self.points = []
+        self.source_point = None
+        self.target_point = None
+        self.offset = (0.0, 0.0)
+        geo = elem.find("mxGeometry")
+        if geo is not None:
+            self.geometry = geo
+            for child in geo:
+                point = (float(child.get("x", 0)), float(child.get("y", 0)))
+                role = child.get("as")
+                if child.tag == "mxPoint" and role == "sourcePoint":
+                    self.source_point = point
+                elif child.tag == "mxPoint" and role == "targetPoint":
+                    self.target_point = point
+                elif child.tag == "mxPoint" and role == "offset":
+                    self.offset = point
+                elif child.tag == "Array" and role == "points":
+                    self.points = [(float(p.get("x", 0)), float(p.get("y", 0)))
+                                   for p in child.findall("mxPoint")]
+
+    def geo(self, name, default=0.0):
+        if self.geometry is None:
+            return default
+        return float(self.geometry.get(name, default))
+
+    @property
+    def relative(self):
+        return self.geometry is not None and self.geometry.get("relative") == "1"
+
+
+class Scene:
+    """Drawing primitives for one diagram page, in model coordinates
+
+    Each primitive is a tuple whose first item names its kind:
+      ("rect", x, y, w, h, radius, paint)
+      ("ellipse", cx, cy, rx, ry, paint)
+      ("polygon", points, paint)
+      ("polyline", points, paint)
+      ("cylinder", x, y, w, h, ry, paint)
+      ("image", x, y, w, h, href)
+      ("text", x, baseline, line_height, lines, anchor, font)
+    """
+
+    def __init__(self, ops, bounds):
+        self.ops = ops
+        x, y, w, h = bounds
+        self.dx, self.dy = BORDER - x, BORDER - y
+        self.width = math.ceil(w + 2 * BORDER)
+        self.height = math.ceil(h + 2 * BORDER)
+
+
+class Layout:
+    """Resolves an mxGraphModel into a Scene"""
+
+    def __init__(self, model):
+        self.cells = {}
+        self.order = []
+        root = model.find("root")
+        for elem in (root if root is not None else []):
+            if elem.tag in ("UserObject", "object"):
+                # Cells wrapped in metadata objects keep their label on the wrapper
+                inner = elem.find("mxCell")
+                if inner is None:
+                    continue
+                inner.set("id", elem.get("id"))
+                inner.set("value", elem.get("label", ""))
+                elem = inner
+            if elem.tag != "mxCell":
+                continue
+            cell = Cell(elem)
+            self.cells[cell.id] = cell
+            self.order.append(cell)
+        self.bounds_cache = {}
+
+    # Geometry -----------------------------------------------------------
+
+    def is_layer_or_root(self, cell):
+        return cell.parent is None or cell.parent not in self.cells
+
+    def is_edge_label(self, cell):
+        parent = self.cells.get(cell.parent)
+        return cell.relative and parent is not None and parent.edge
+
+    def origin(self, cell):
+        """Absolute offset of a cell's coordinate space (its parent vertex)"""
+        parent = self.cells.get(cell.parent)
+        if parent is None or not parent.vertex:
+            return 0.0, 0.0
+        x, y, _, _ = self.bounds(parent)
+        return x, y
+
+    def bounds(self, cell):
+        """Absolute (x, y, width, height) of a vertex"""
+        if cell.id in self.bounds_cache:
+            return self.bounds_cache[cell.id]
+        if self.is_edge_label(cell):
+            x, y = self.edge_label_point(self.cells[cell.parent], cell.geo("x"))
+            w, h = cell.geo("width"), cell.geo("height")
+            result = (x + cell.offset[0] - w / 2, y + cell.offset[1] - h / 2, w, h)
+        else:
+            ox, oy = self.origin(cell)
+            result = (ox + cell.geo("x"), oy + cell.geo("y"),
+                      cell.geo("width"), cell.geo("height"))
+        self.bounds_cache[cell.id] = result
+        return result
+
+    def shape(self, cell):
+        if cell is None:
+            return "rect"
+        return cell.style.get("shape", "rect")
+
+    def edge_route(self, edge):
+        """Absolute polyline of an edge, clipped to its terminals' outlines"""
+        ox, oy = self.origin(edge)
+        source = self.cells.get(edge.source)
+        target = self.cells.get(edge.target)
+        waypoints = [(ox + x, oy + y) for x, y in edge.points]
+
+        def anchor(terminal, fallback, prefix):
+            if terminal is None or not terminal.vertex:
+                if fallback is None:
+                    return None, None
+                return (ox + fallback[0], oy + fallback[1]), None
+            x, y, w, h = self.bounds(terminal)
+            fx, fy = edge.style.get(prefix + "X"), edge.style.get(prefix + "Y")
+            if fx is not None and fy is not None:
+                return (x + float(fx) * w, y + float(fy) * h), None
+            return (x + w / 2, y + h / 2), (x, y, w, h)
+
+        start, source_box = anchor(source, edge.source_point, "exit")
+        end, target_box = anchor(target, edge.target_point, "entry")
+        if start is None or end is None:
+            return []
+
+        if not waypoints and edge.style.get("edgeStyle") in (
+                "orthogonalEdgeStyle", "elbowEdgeStyle", "entityRelationEdgeStyle"):
+            waypoints = orthogonal_bends(start, end, source_box, target_box)
+
+        route = [start] + waypoints + [end]
+        if source_box is not None:
+            route[0] = clip_to_box(source_box, route[1], self.shape(source))
+        if target_box is not None:
+            route[-1] = clip_to_box(target_box, route[-2], self.shape(target))
+        return route
+
+    def edge_label_point(self, edge, position):
+        """Point along an edge; position runs from -1 (source) to 1 (target)"""
+        route = self.edge_route(edge)
+        if not route:
+            return 0.0, 0.0
+        return point_along(route, (position + 1) / 2)
+
+    def extent(self):
+        """Bounding box of everything drawn"""
+        xs, ys = [], []
+        for cell in self.order:
+            if cell.vertex and not self.is_layer_or_root(cell):
+                x, y, w, h = self.bounds(cell)
+                xs += [x, x + w]
+                ys += [y, y + h]
+            elif cell.edge:
+                for x, y in self.edge_route(cell):
+                    xs.append(x)
+                    ys.append(y)
+        if not xs:
+            return 0.0, 0.0, 1.0, 1.0
+        return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+    # Primitives ---------------------------------------------------------
+
+    def scene(self):
+        ops = []
+        for cell in self.order:
+            if cell.vertex and not self.is_layer_or_root(cell):
+                ops.extend(self.vertex_ops(cell))
+            elif cell.edge:
+                ops.extend(self.edge_ops(cell))
+        return Scene(ops, self.extent())
+
+    def vertex_ops(self, cell):
+        style = cell.style
+        x, y, w, h = self.bounds(cell)
+        shape = style.get("shape", "rect")
+        is_text = shape in ("text", "label") and "fillColor" not in style
+        fill = color(style.get("fillColor"), "none" if is_text else "#ffffff")
+        stroke = color(style.get("strokeColor"), "none" if is_text else "#000000")
+        paint = make_paint(style, fill, stroke)
+        ops = []
+        if self.is_edge_label(cell):
+            # Labels attached to an edge only draw their text
+            pass
+        elif shape in ("ellipse", "doubleEllipse"):
+            ops.append(("ellipse", x + w / 2, y + h / 2, w / 2, h / 2, paint))
+        elif shape == "rhombus":
+            ops.append(("polygon", [(x + w / 2, y), (x + w, y + h / 2),
+                                    (x + w / 2, y + h), (x, y + h / 2)], paint))
+        elif shape == "hexagon":
+            size = w * 0.25
+            ops.append(("polygon", [(x + size, y), (x + w - size, y), (x + w, y + h / 2),
+                                    (x + w - size, y + h), (x + size, y + h),
+                                    (x, y + h / 2)], paint))
+        elif shape in ("cylinder", "cylinder3"):
+            ops.append(("cylinder", x, y, w, h, min(h * 0.1, 15), paint))
+        elif shape == "umlActor":
+            head = h / 4
+            cx = x + w / 2
+            lines = dict(paint, fill="none")
+            ops.append(("ellipse", cx, y + head / 2, w / 4, head / 2, paint))
+            ops.append(("polyline", [(cx, y + head), (cx, y + 2 * h / 3)], lines))
+            ops.append(("polyline", [(x, y + h), (cx, y + 2 * h / 3), (x + w, y + h)], lines))
+            ops.append(("polyline", [(x, y + h / 3), (x + w, y + h / 3)], lines))
+        elif shape == "swimlane":
+            start = float(style.get("startSize", 23))
+            ops.append(("rect", x, y, w, h, corner_radius(style, w, h), paint))
+            ops.append(("polyline", [(x, y + start), (x + w, y + start)],
+                        dict(paint, fill="none")))
+        elif shape == "image" and style.get("image"):
+            ops.append(("image", x, y, w, h, style["image"]))
+        elif fill != "none" or stroke != "none":
+            ops.append(("rect", x, y, w, h, corner_radius(style, w, h), paint))
+
+        label_box = (x, y, w, h)
+        if shape == "swimlane":
+            label_box = (x, y, w, float(style.get("startSize", 23)))
+        ops.extend(self.label_ops(cell, label_box))
+        return ops
+
+    def edge_ops(self, cell):
+        style = cell.style
+        route = self.edge_route(cell)
+        if len(route) < 2:
+            return []
+        stroke = color(style.get("strokeColor"), "#000000")
+        if stroke == "none":
+            return []
+        paint = make_paint(style, "none", stroke)
+        end_arrow = style.get("endArrow", "classic")
+        start_arrow = style.get("startArrow", "none")
+        # Shorten the line so it does not poke through filled arrowheads
+        points = list(route)
+        length = arrow_length(paint["width"])
+        if end_arrow in ("classic", "block"):
+            points[-1] = back_off(points[-2], points[-1], length)
+        if start_arrow in ("classic", "block"):
+            points[0] = back_off(points[1], points[0], length)
+
+        ops = [("polyline", points, paint)]
+        ops.extend(arrowhead(route[-2], route[-1], end_arrow, paint))
+        ops.extend(arrowhead(route[1], route[0], start_arrow, paint))
+
+        if cell.value:
+            mx, my = point_along(route, 0.5)
+            ops.extend(self.label_ops(cell, (mx, my, 0, 0), edge_label=True))
+        return ops
+
+    def label_ops(self, cell, box, edge_label=False):
+        style = cell.style
+        lines = label_text(cell.value, style.get("html") == "1")
+        if not any(lines):
+            return []
+        x, y, w, h = box
+        if self.is_edge_label(cell):
+            edge_label = True
+        font_size = float(style.get("fontSize", DEFAULT_FONT_SIZE))
+        font_style = int(style.get("fontStyle", 0) or 0)
+        bold = bool(font_style & FONT_BOLD)
+        spacing = float(style.get("spacing", 2))
+
+        position = style.get("labelPosition", "center")
+        vposition = style.get("verticalLabelPosition", "middle")
+        if position == "left":
+            x -= w
+        elif position == "right":
+            x += w
+        if vposition == "top":
+            y -= h
+        elif vposition == "bottom":
+            y += h
+
+        if style.get("whiteSpace") == "wrap" and w > 0:
+            lines = wrap_lines(lines, w - 2 * spacing, font_size, bold)
+
+        align = style.get("align", "center")
+        valign = style.get("verticalAlign", "middle")
+        if vposition == "bottom" and "verticalAlign" not in style:
+            valign = "top"
+        line_height = font_size * LINE_HEIGHT
+        block = line_height * len(lines)
+
+        if align == "left":
+            tx, anchor = x + spacing, "start"
+        elif align == "right":
+            tx, anchor = x + w - spacing, "end"
+        else:
+            tx, anchor = x + w / 2, "middle"
+        if valign == "top":
+            top = y + spacing
+        elif valign == "bottom":
+            top = y + h - spacing - block
+        else:
+            top = y + (h - block) / 2
+
+        ops = []
+        background = style.get("labelBackgroundColor", "#ffffff" if edge_label else "none")
+        if background != "none":
+            char_width = font_size * (BOLD_CHAR_WIDTH if bold else CHAR_WIDTH)
+            bw = max(len(line) for line in lines) * char_width + 2 * spacing
+            bx = {"start": tx - spacing, "end": tx - bw + spacing}.get(anchor, tx - bw / 2)
+            ops.append(("rect", bx, top, bw, block, 0,
+                        make_paint({}, background, "none")))
+
+        font = {
+            "size": font_size,
+            "family": style.get("fontFamily"),
+            "bold": bold,
+            "italic": bool(font_style & FONT_ITALIC),
+            "underline": bool(font_style & FONT_UNDERLINE),
+            "color": color(style.get("fontColor"), "#000000"),
+        }
+        # Baseline sits roughly 0.8 em below the top of each line box
+        baseline = top + (line_height - font_size) / 2 + font_size * 0.8
+        ops.append(("text", tx, baseline, line_height, lines, anchor, font))
+        return ops
+
+
+# Geometry helpers -------------------------------------------------------------
+
+def corner_radius(style, w, h):
+    if style.get("rounded") != "1":
+        return 0
+    if style.get("absoluteArcSize") == "1":
+        return float(style.get("arcSize", 10)) / 2
+    return min(w, h) * float(style.get("arcSize", ROUNDING_FACTOR * 100)) / 100
+
+
+def orthogonal_bends(start, end, source_box, target_box):
+    """Bend points for a simple elbow route between two terminals"""
+    (sx, sy), (tx, ty) = start, end
+    if source_box is not None and target_box is not None:
+        left = max(source_box[0], target_box[0])
+        right = min(source_box[0] + source_box[2], target_box[0] + target_box[2])
+        top = max(source_box[1], target_box[1])
+        bottom = min(source_box[1] + source_box[3], target_box[1] + target_box[3])
+        if left < right and abs(ty - sy) > abs(tx - sx) / 4:
+            x = (left + right) / 2
+            return [(x, sy), (x, ty)]
+        if top < bottom:
+            y = (top + bottom) / 2
+            return [(sx, y), (tx, y)]
+    if abs(tx - sx) >= abs(ty - sy):
+        mid = (sx + tx) / 2
+        return [(mid, sy), (mid, ty)]
+    mid = (sy + ty) / 2
+    return [(sx, mid), (tx, mid)]
+
+
+def clip_to_box(box, toward, shape):
+    """Where the segment from the box centre to toward leaves the outline"""
+    x, y, w, h = box
+    cx, cy = x + w / 2, y + h / 2
+    dx, dy = toward[0] - cx, toward[1] - cy
+    if dx == 0 and dy == 0:
+        return cx, cy
+    if shape in ("ellipse", "doubleEllipse") and w > 0 and h > 0:
+        t = 1 / math.sqrt((dx / (w / 2)) ** 2 + (dy / (h / 2)) ** 2)
+    elif shape == "rhombus" and w > 0 and h > 0:
+        t = 1 / (abs(dx) / (w / 2) + abs(dy) / (h / 2))
+    else:
+        tx = (w / 2) / abs(dx) if dx else math.inf
+        ty = (h / 2) / abs(dy) if dy else math.inf
+        t = min(tx, ty)
+    t = min(t, 1.0)
+    return cx + dx * t, cy + dy * t
+
+
+def point_along(route, fraction):
+    """Point at a fraction of a polyline's length"""
+    lengths = [math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(route, route[1:])]
+    remaining = sum(lengths) * min(max(fraction, 0.0), 1.0)
+    for (a, b), length in zip(zip(route, route[1:]), lengths):
+        if remaining <= length and length > 0:
+            t = remaining / length
+            return a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t
+        remaining -= length
+    return route[-1]
+
+
+def arrow_length(width):
+    return ARROW_SIZE + 2 * width
+
+
+def back_off(start, end, distance):
+    """Move end towards start by distance"""
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = math.hypot(dx, dy)
+    if length <= distance or length == 0:
+        return end
+    return end[0] - dx / length * distance, end[1] - dy / length * distance
+
+
+def arrowhead(start, tip, kind, paint):
+    """Marker at tip for an edge segment running from start"""
+    if kind in (None, "none", ""):
+        return []
+    dx, dy = tip[0] - start[0], tip[1] - start[1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return []
+    ux, uy = dx / length, dy / length
+    size = arrow_length(paint["width"])
+    half = size * 0.45
+    base = (tip[0] - ux * size, tip[1] - uy * size)
+    left = (base[0] - uy * half, base[1] + ux * half)
+    right = (base[0] + uy * half, base[1] - ux * half)
+    solid = dict(paint, dash=None)
+    if kind == "open":
+        return [("polyline", [left, tip, right], solid)]
+    points = [left, tip, right]
+    if kind == "classic":
+        points.append((tip[0] - ux * size * 0.7, tip[1] - uy * size * 0.7))
+    return [("polygon", points, dict(solid, fill=paint["stroke"]))]
+
+
+# SVG backend ----------------------------------------------------------------
+
+def fmt(value):
+    """Format a coordinate compactly and deterministically"""
+    value = round(value, 2)
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.2f}".rstrip("0")
+
+
+def svg_points(points):
+    return " ".join(f"{fmt(px)},{fmt(py)}" for px, py in points)
+
+
+def svg_paint(paint):
+    attrs = f' fill={quoteattr(paint["fill"])}'
+    if paint["fill"] != "none" and paint["fill_opacity"] < 1:
+        attrs += f' fill-opacity="{fmt(paint["fill_opacity"])}"'
+    attrs += svg_stroke(paint)
+    if paint["opacity"] < 1:
+        attrs += f' opacity="{fmt(paint["opacity"])}"'
+    return attrs
+
+
+def svg_stroke(paint):
+    if paint["stroke"] == "none":
+        return ' stroke="none"'
+    attrs = f' stroke={quoteattr(paint["stroke"])} stroke-width="{fmt(paint["width"])}"'
+    if paint["dash"]:
+        attrs += f' stroke-dasharray="{" ".join(fmt(d) for d in paint["dash"])}"'
+    if paint["stroke_opacity"] < 1:
+        attrs += f' stroke-opacity="{fmt(paint["stroke_opacity"])}"'
+    return attrs
+
+
+def svg_element(op):
+    kind = op[0]
+    if kind == "rect":
+        _, x, y, w, h, radius, paint = op
+        corners = f' rx="{fmt(radius)}" ry="{fmt(radius)}"' if radius else ""
+        return [f'<rect x="{fmt(x)}" y="{fmt(y)}" width="{fmt(w)}" height="{fmt(h)}"'
+                f'{corners}{svg_paint(paint)}/>']
+    if kind == "ellipse":
+        _, cx, cy, rx, ry, paint = op
+        return [f'<ellipse cx="{fmt(cx)}" cy="{fmt(cy)}" rx="{fmt(rx)}" ry="{fmt(ry)}"'
+                f'{svg_paint(paint)}/>']
+    if kind == "polygon":
+        return [f'<polygon points="{svg_points(op[1])}"{svg_paint(op[2])}/>']
+    if kind == "polyline":
+        return [f'<polyline points="{svg_points(op[1])}"{svg_paint(dict(op[2], fill="none"))}/>']
+    if kind == "cylinder":
+        _, x, y, w, h, ry, paint = op
+        rx = w / 2
+        return [
+            f'<path d="M {fmt(x)} {fmt(y + ry)} '
+            f'A {fmt(rx)} {fmt(ry)} 0 0 1 {fmt(x + w)} {fmt(y + ry)} '
+            f'L {fmt(x + w)} {fmt(y + h - ry)} '
+            f'A {fmt(rx)} {fmt(ry)} 0 0 1 {fmt(x)} {fmt(y + h - ry)} Z"{svg_paint(paint)}/>',
+            f'<path d="M {fmt(x)} {fmt(y + ry)} '
+            f'A {fmt(rx)} {fmt(ry)} 0 0 0 {fmt(x + w)} {fmt(y + ry)}" '
+            f'fill="none"{svg_stroke(paint)}/>',
+        ]
+    if kind == "image":
+        _, x, y, w, h, href = op
+        return [f'<image x="{fmt(x)}" y="{fmt(y)}" width="{fmt(w)}" height="{fmt(h)}" '
+                f'href={quoteattr(href)}/>']
+    if kind == "text":
+        _, x, baseline, line_height, lines, anchor, font = op
+        attrs = [f'font-size="{fmt(font["size"])}"', f'text-anchor="{anchor}"',
+                 f'fill={quoteattr(font["color"])}']
+        if font["family"]:
+            attrs.append(f'font-family={quoteattr(font["family"])}')
+        if font["bold"]:
+            attrs.append('font-weight="bold"')
+        if font["italic"]:
+            attrs.append('font-style="italic"')
+        if font["underline"]:
+            attrs.append('text-decoration="underline"')
+        out = [f'<text {" ".join(attrs)}>']
+        for index, line in enumerate(lines):
+            out.append(f'<tspan x="{fmt(x)}" y="{fmt(baseline + index * line_height)}">'
+                       f'{escape(line)}</tspan>')
+        out.append("</text>")
+        return out
+    raise ValueError(f"unknown primitive {kind!r}")
+
+
+def scene_to_svg(scene):
+    width, height = scene.width, scene.height
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+        f'width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<rect x="0" y="0" width="{width}" height="{height}" fill="#ffffff"/>',
+        f'<g transform="translate({fmt(scene.dx)},{fmt(scene.dy)})" '
+        f'font-family={quoteattr(DEFAULT_FONT_FAMILY)}>',
+    ]
+    for op in scene.ops:
+        parts.extend(svg_element(op))
+    parts.append("</g>")
+    parts.append("</svg>")
+    return "\n".join(parts) + "\n"
+
+
+# PNG backend (PIL) ----------------------------------------------------------
+
+class RasterCanvas:
+    """Draws Scene primitives onto a supersampled PIL image"""
+
+    FONT_FILES = {
+        (False, False): ["DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"],
+        (True, False): ["DejaVuSans-Bold.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf"],
+        (False, True): ["DejaVuSans-Oblique.ttf", "Arial Italic.ttf", "LiberationSans-Italic.ttf"],
+        (True, True): ["DejaVuSans-BoldOblique.ttf", "Arial Bold Italic.ttf",
+                       "LiberationSans-BoldItalic.ttf"],
+    }
+
+    def __init__(self, scene, scale=1.0):
+        from PIL import Image, ImageDraw, ImageColor
+        self.Image = Image
+        self.ImageColor = ImageColor
+        self.scene = scene
+        self.factor = scale * SUPERSAMPLE
+        self.size = (max(1, round(scene.width * scale)), max(1, round(scene.height * scale)))
+        self.image = Image.new("RGB", (self.size[0] * SUPERSAMPLE, self.size[1] * SUPERSAMPLE),
+                               "#ffffff")
+        self.draw = ImageDraw.Draw(self.image, "RGBA")
+        self.fonts = {}
+
+    def xy(self, x, y):
+        return ((x + self.scene.dx) * self.factor, (y + self.scene.dy) * self.factor)
+
+    def rgba(self, value, alpha=1.0):
+        if value in (None, "none"):
+            return None
+        try:
+            r, g, b = self.ImageColor.getrgb(value)[:3]
+        except ValueError:
+            return None
+        return (r, g, b, round(255 * max(0.0, min(alpha, 1.0))))
+
+    def fill(self, paint):
+        return self.rgba(paint["fill"], paint["fill_opacity"] * paint["opacity"])
+
+    def stroke(self, paint):
+        return self.rgba(paint["stroke"], paint["stroke_opacity"] * paint["opacity"])
+
+    def width(self, paint):
+        return max(1, round(paint["width"] * self.factor))
+
+    def font(self, font):
+        size = max(1, round(font["size"] * self.factor))
+        key = (size, font["bold"], font["italic"])
+        if key not in self.fonts:
+            from PIL import ImageFont
+            loaded = None
+            for name in self.FONT_FILES[(font["bold"], font["italic"])]:
+                try:
+                    loaded = ImageFont.truetype(name, size)
+                    break
+                except OSError:
+                    continue
+            if loaded is None:
+                try:
+                    loaded = ImageFont.load_default(size)
+                except TypeError:
+                    loaded = ImageFont.load_default()
+            self.fonts[key] = loaded
+        return self.fonts[key]
+
+    def outline(self, points, paint, closed):
+        """Stroke a polyline, honouring dash patterns"""
+        stroke = self.stroke(paint)
+        if stroke is None or len(points) < 2:
+            return
+        points = [self.xy(*p) for p in points]
+        if closed:
+            points.append(points[0])
+        width = self.width(paint)
+        if not paint["dash"]:
+            self.draw.line(points, fill=stroke, width=width, joint="curve")
+            return
+        for segment in dash_segments(points, [d * self.factor for d in paint["dash"]]):
+            self.draw.line(segment, fill=stroke, width=width)
+
+    def render(self, op):
+        kind = op[0]
+        if kind == "rect":
+            _, x, y, w, h, radius, paint = op
+            box = [self.xy(x, y), self.xy(x + w, y + h)]
+            fill = self.fill(paint)
+            if paint["dash"] or radius == 0:
+                if fill:
+                    self.draw.rectangle(box, fill=fill)
+                self.outline([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], paint, True)
+            else:
+                self.draw.rounded_rectangle(box, radius=radius * self.factor, fill=fill,
+                                            outline=self.stroke(paint), width=self.width(paint))
+        elif kind == "ellipse":
+            _, cx, cy, rx, ry, paint = op
+            box = [self.xy(cx - rx, cy - ry), self.xy(cx + rx, cy + ry)]
+            self.draw.ellipse(box, fill=self.fill(paint), outline=self.stroke(paint),
+                              width=self.width(paint))
+        elif kind == "polygon":
+            _, points, paint = op
+            fill = self.fill(paint)
+            if fill:
+                self.draw.polygon([self.xy(*p) for p in points], fill=fill)
+            self.outline(points, paint, True)
+        elif kind == "polyline":
+            self.outline(op[1], op[2], False)
+        elif kind == "cylinder":
+            _, x, y, w, h, ry, paint = op
+            fill, stroke, width = self.fill(paint), self.stroke(paint), self.width(paint)
+            top = [self.xy(x, y), self.xy(x + w, y + 2 * ry)]
+            bottom = [self.xy(x, y + h - 2 * ry), self.xy(x + w, y + h)]
+            if fill:
+                self.draw.ellipse(bottom, fill=fill)
+                self.draw.rectangle([self.xy(x, y + ry), self.xy(x + w, y + h - ry)], fill=fill)
+            self.draw.ellipse(top, fill=fill, outline=stroke, width=width)
+            if stroke:
+                self.draw.arc(bottom, 0, 180, fill=stroke, width=width)
+            self.outline([(x, y + ry), (x, y + h - ry)], paint, False)
+            self.outline([(x + w, y + ry), (x + w, y + h - ry)], paint, False)
+        elif kind == "text":
+            _, x, baseline, line_height, lines, anchor, font = op
+            pil_font = self.font(font)
+            fill = self.rgba(font["color"])
+            align = {"start": "l", "middle": "m", "end": "r"}[anchor]
+            for index, line in enumerate(lines):
+                position = self.xy(x, baseline + index * line_height)
+                try:
+                    self.draw.text(position, line, font=pil_font, fill=fill, anchor=align + "s")
+                except ValueError:
+                    # Bitmap fonts cannot anchor on the baseline
+                    width = self.draw.textlength(line, font=pil_font)
+                    offset = {"l": 0, "m": width / 2, "r": width}[align]
+                    self.draw.text((position[0] - offset, position[1] - font["size"] * self.factor),
+                                   line, font=pil_font, fill=fill)
+        # "image" primitives reference external files and are skipped in PNGs
+
+    def finish(self):
+        for op in self.scene.ops:
+            self.render(op)
+        return self.image.resize(self.size, self.Image.LANCZOS)
+
+
+def dash_segments(points, pattern):
+    """Split a polyline into the visible pieces of a dash pattern"""
+    pattern = [max(p, 1) for p in pattern] or [1]
+    index, remaining, drawing = 0, pattern[0], True
+    segments, current = [], [points[0]]
+    for a, b in zip(points, points[1:]):
+        length = math.hypot(b[0] - a[0], b[1] - a[1])
+        position = 0.0
+        while length - position > remaining:
+            position += remaining
+            t = position / length
+            point = (a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t)
+            if drawing:
+                current.append(point)
+                segments.append(current)
+            current = [point]
+            drawing = not drawing
+            index = (index + 1) % len(pattern)
+            remaining = pattern[index]
+        remaining -= length - position
+        if drawing:
+            current.append(b)
+        else:
+            current = [b]
+    if drawing and len(current) > 1:
+        segments.append(current)
+    return segments
+
+
+# Entry points ---------------------------------------------------------------
+
+
+
+def inflate_model(payload, chunk_size=INFLATE_CHUNK):
+    """Parse a compressed <diagram> payload into an mxGraphModel
+
+    The payload is base64 decoded, inflated and URI-decoded a chunk at a
+    time and fed straight into the XML parser, so the decompressed text is
+    never held in memory as a whole.
+    """
+    payload = ''.join(payload.split())
+    step = max(4, chunk_size - chunk_size % 4)
+    inflater = zlib.decompressobj(-15)
+    parser = ET.XMLParser()
+    pending = b''
+    for start in range(0, len(payload), step):
+        pending += inflater.decompress(base64.b64decode(payload[start:start + step]))
+        # Hold back a %XX escape split across chunks
+        cut = pending.rfind(b'%', max(0, len(pending) - 2))
+        if cut == -1:
+            cut = len(pending)
+        parser.feed(unquote_to_bytes(pending[:cut]))
+        pending = pending[cut:]
+    parser.feed(unquote_to_bytes(pending + inflater.flush()))
+    return parser.close()
+
+
+def iter_pages(source):
+    """Yield (name, mxGraphModel) for every page of a .drawio file
+
+    source is a path or binary file object. The file is read with
+    iterparse and each page is dropped once the caller moves on, so memory
+    is bounded by the largest page rather than the whole file.
+    """
+    root = None
+    index = 0
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == 'mxGraphModel' and elem is root:
+            # A bare model saved without the mxfile wrapper
+            yield "Page-1", elem
+            return
+        if elem.tag != 'diagram':
+            continue
+        index += 1
+        model = elem.find('mxGraphModel')
+        if model is None and elem.text and elem.text.strip():
+            model = inflate_model(elem.text)
+        if model is not None:
+            yield elem.get('name') or f"Page-{index}", model
+        elem.clear()
+        if root is not elem:
+            for child in list(root):
+                root.remove(child)
+
+
+def page_stem(stem, index):
+    """Output file stem for a page: the first page keeps the diagram name"""
+    return stem if index == 0 else f"{stem}-page-{index + 1}"
+
+
+def find_model(source):
+    """Return the first mxGraphModel from XML text or an element
+
+    Accepts an mxGraphModel, a <diagram> or a whole <mxfile>; compressed
+    diagram payloads are decoded.
+    """
+    root = ET.fromstring(source) if isinstance(source, (str, bytes)) else source
+    if root.tag == "mxGraphModel":
+        return root
+    model = root.find(".//mxGraphModel")
+    if model is not None:
+        return model
+    diagram = root if root.tag == "diagram" else root.find(".//diagram")
+    if diagram is not None and diagram.text and diagram.text.strip():
+        return inflate_model(diagram.text)
+    raise ValueError("no mxGraphModel found")
+
+
+def build_scene(source):
+    """Lay out mxGraph XML (text or element) as drawing primitives"""
+    return Layout(find_model(source)).scene()
+
+
+def render_svg(source):
+    """Render mxGraph XML to an SVG document string"""
+    return scene_to_svg(build_scene(source))
+
+
+
+
+
+
+def render_to_files(source, svg_path=None, png_path=None, scale=1.0):
+    """Render mxGraph XML to SVG and/or PNG from one layout pass
+
+    Returns the paths written; the PNG is skipped when Pillow is missing.
+    """
+    scene = build_scene(source)
+    written = []
+    if svg_path is not None:
+        with open(svg_path, 'w', encoding='utf-8') as f:
+            f.write(scene_to_svg(scene))
+        written.append(svg_path)
+    if png_path is not None:
+        try:
+            image = RasterCanvas(scene, scale).finish()
+        except ImportError:
+            return written
+        image.save(png_path, 'PNG', optimize=True)
+        written.append(png_path)
+    return written
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Export stage for the diagram converters
+Turns the full-size PNG a converter just wrote into every published format
+(WebP, AVIF, PDF), responsive widths for srcset, and thumbnails, decoding
+the image only once
+"""
+
+from pathlib import Path
+
+import thumbnails
+
+FORMATS = ['webp', 'avif', 'pdf']
+# Page widths the diagram pages offer in srcset; wider than the image is skipped
+DEFAULT_WIDTHS = [480, 960, 1600]
+# Formats that get responsive widths (PDF is for download only)
+RESPONSIVE_FORMATS = ['png', 'webp', 'avif']
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+# libavif's default speed is several times slower for a few percent smaller files
+AVIF_SPEED = 8
+
+
+def export_path(assets_dir, stem, fmt, width=None):
+    """Where a format (and optionally a responsive width) is written"""
+    name = stem if width is None else f"{stem}-{width}w"
+    return Path(assets_dir) / fmt / f"{name}.{fmt}"
+
+
+def export_paths(assets_dir, stem, formats=None):
+    """Full-size files write_exports always produces"""
+    return [export_path(assets_dir, stem, fmt) for fmt in available(formats)]
+
+
+def encode(image, path, fmt):
+    """Save one export with size-oriented encoder settings"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == 'webp':
+        image.save(path, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'avif':
+        image.save(path, 'AVIF', quality=AVIF_QUALITY, speed=AVIF_SPEED)
+    elif fmt == 'pdf':
+        image.convert('RGB').save(path, 'PDF', resolution=96.0)
+    else:
+        # Palette PNG, same as the thumbnails
+        thumbnails.encode(image, path, 'png')
+
+
+def available(formats=None):
+    """The requested formats this Pillow build can write (none without Pillow)"""
+    try:
+        from PIL import features
+    except ImportError:
+        return []
+    formats = dict.fromkeys(formats if formats is not None else FORMATS)
+    return [fmt for fmt in formats if fmt in ('png', 'pdf') or features.check(fmt)]
+
+
+def write_exports(source_png, assets_dir, stem, formats=None, widths=None, thumbs=None):
+    """Write every export of source_png; returns the paths written
+
+    Full-size files go to <assets>/<format>/<stem>.<format>, responsive
+    widths to <stem>-<width>w.<format> (PNG widths sit next to the
+    original). Widths are reduced largest first, each from the previous
+    one. thumbs is a (sizes, formats) pair for thumbnails.write_thumbnails.
+    Formats this Pillow build cannot encode are skipped with a warning;
+    nothing is written when Pillow is missing.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return []
+    requested = formats if formats is not None else FORMATS
+    formats = available(requested)
+    for fmt in dict.fromkeys(requested):
+        if fmt not in formats:
+            print(f"  ⚠ Pillow cannot write {fmt.upper()} here, skipping it")
+    widths = sorted(set(widths if widths is not None else DEFAULT_WIDTHS), reverse=True)
+
+    with Image.open(source_png) as image:
+        full = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    written = []
+    for fmt in formats:
+        path = export_path(assets_dir, stem, fmt)
+        encode(full, path, fmt)
+        written.append(path)
+
+    responsive = ['png'] + [fmt for fmt in formats if fmt in RESPONSIVE_FORMATS]
+    current = full
+    for width in widths:
+        if width >= full.width:
+            continue
+        height = max(1, round(full.height * width / full.width))
+        current = current.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt in responsive:
+            path = export_path(assets_dir, stem, fmt, width)
+            encode(current, path, fmt)
+            written.append(path)
+
+    return written + thumbnails.write_thumbnails(full, Path(assets_dir) / "png", stem,
+                                                 *(thumbs or ()))
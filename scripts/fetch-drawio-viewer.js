@@ -0,0 +1,43 @@
+#!/usr/bin/env node
+/**
+ * Download the draw.io viewer used by render-drawio-batch.js
+ * Fetches viewer-static.min.js from a pinned draw.io release into
+ * scripts/drawio-viewer/ (gitignored). Skips the download when the file is
+ * already there; pass --force to replace it.
+ *
+ * Usage: node scripts/fetch-drawio-viewer.js [--force]
+ *   DRAWIO_VERSION  release tag to fetch (default below)
+ */
+const fs = require('fs');
+const path = require('path');
+
+// Bump together with a re-render of the diagrams: the viewer decides how they look
+const DRAWIO_VERSION = process.env.DRAWIO_VERSION || 'v24.7.17';
+const SOURCE = `https://cdn.jsdelivr.net/gh/jgraph/drawio@${DRAWIO_VERSION}/src/main/webapp/js/viewer-static.min.js`;
+const TARGET = path.join(__dirname, 'drawio-viewer', 'viewer-static.min.js');
+
+async function main() {
+  if (fs.existsSync(TARGET) && !process.argv.includes('--force')) {
+    console.log(`✓ draw.io viewer already present at ${TARGET}`);
+    return;
+  }
+  console.log(`Downloading draw.io viewer ${DRAWIO_VERSION}...`);
+  const res = await fetch(SOURCE);
+  if (!res.ok) {
+    throw new Error(`GET ${SOURCE} returned HTTP ${res.status}`);
+  }
+  const body = await res.text();
+  if (!body.includes('GraphViewer')) {
+    throw new Error(`${SOURCE} does not look like the draw.io viewer`);
+  }
+  // Write next to the target first so an interrupted download never leaves half a file
+  fs.mkdirSync(path.dirname(TARGET), { recursive: true });
+  fs.writeFileSync(`${TARGET}.tmp`, body);
+  fs.renameSync(`${TARGET}.tmp`, TARGET);
+  console.log(`✓ Saved ${(body.length / 1024).toFixed(0)} KB to ${TARGET}`);
+}
+
+main().catch(e => {
+  console.error(`✗ ${e.message}`);
+  process.exit(1);
+});
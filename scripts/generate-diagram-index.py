@@ -5,163 +5,88 @@ This script scans the diagrams directory and creates YAML data for Jekyll
 """
 
 import os
+import re
 import json
+import struct
+import argparse
 import yaml
 from pathlib import Path
+from string import Template
+
+from diagram_metadata import MetadataStore
+import instrumentation
 
 # Configuration
 DIAGRAM_SOURCE_DIR = "40-resources/diagrams"
 OUTPUT_DIR = "diagrams"
 ASSETS_DIR = f"{OUTPUT_DIR}/assets"
 DATA_DIR = "_data"
+SEARCH_DIR = f"{OUTPUT_DIR}/search"
 
-# Diagram metadata
-DIAGRAM_INFO = {
-    "01-complete-system-architecture.drawio": {
-        "title": "Complete System Architecture",
-        "description": "End-to-end system architecture showing all AWS services, load balancers, microservices, and data flow from users to databases.",
-        "category": "System Architecture",
-        "complexity": "High",
-        "tags": ["AWS", "Infrastructure", "Overview", "Fargate", "RDS"]
-    },
-    "02-security-architecture.drawio": {
-        "title": "Security Architecture",
-        "description": "Multi-layered security implementation with AWS WAF, Shield, VPC security groups, and application-level protection mechanisms.",
-        "category": "Security",
-        "complexity": "High", 
-        "tags": ["Security", "WAF", "Shield", "VPC", "Authentication"]
-    },
-    "03-cicd-pipeline.drawio": {
-        "title": "CI/CD Pipeline Architecture",
-        "description": "Complete GitLab CI/CD pipeline showing 7 stages from code commit to production deployment with approval gates and rollback strategies.",
-        "category": "DevOps",
-        "complexity": "Medium",
-        "tags": ["GitLab", "CI/CD", "Pipeline", "Deployment", "Automation"]
-    },
-    "04-microservices-deployment.drawio": {
-        "title": "Microservices Deployment",
-        "description": "Detailed microservices architecture on AWS Fargate showing service communication, load balancing, and container orchestration.",
-        "category": "Architecture",
-        "complexity": "High",
-        "tags": ["Microservices", "Fargate", "Spring Boot", "Angular", "Communication"]
-    },
-    "05-data-flow-architecture.drawio": {
-        "title": "Data Flow Architecture", 
-        "description": "Request processing flow and event-driven communication patterns showing user journeys, API gateway routing, and database operations.",
-        "category": "Data Flow",
-        "complexity": "Medium",
-        "tags": ["Data Flow", "Events", "API Gateway", "Processing", "Observability"]
-    }
-}
-
-def ensure_directories():
-    """Create necessary directories"""
-    os.makedirs(DATA_DIR, exist_ok=True)
-    os.makedirs(f"{OUTPUT_DIR}/pages", exist_ok=True)
+# libyaml's emitter is many times faster than the pure-Python one
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
-def scan_diagrams():
-    """Scan for diagram files and generate metadata"""
-    diagrams = []
-    
-    if not os.path.exists(DIAGRAM_SOURCE_DIR):
-        print(f"Warning: {DIAGRAM_SOURCE_DIR} does not exist")
-        return diagrams
-    
-    for file_path in Path(DIAGRAM_SOURCE_DIR).glob("*.drawio"):
-        filename = file_path.name
-        base_name = filename.replace(".drawio", "")
-        
-        # Get metadata
-        info = DIAGRAM_INFO.get(filename, {
-            "title": base_name.replace("-", " ").title(),
-            "description": f"Architecture diagram: {base_name}",
-            "category": "General",
-            "complexity": "Medium",
-            "tags": ["Architecture"]
-        })
-        
-        # Check for generated assets
-        png_path = f"{ASSETS_DIR}/png/{base_name}.png"
-        svg_path = f"{ASSETS_DIR}/svg/{base_name}.svg" 
-        thumb_path = f"{ASSETS_DIR}/png/{base_name}_thumb.png"
-        
-        diagram_data = {
-            "id": base_name,
-            "title": info["title"],
-            "description": info["description"],
-            "category": info["category"],
-            "complexity": info["complexity"],
-            "tags": info["tags"],
-            "source_file": f"{DIAGRAM_SOURCE_DIR}/{filename}",
-            "url": f"/diagrams/{base_name}/",
-            "drawio": f"/{DIAGRAM_SOURCE_DIR}/{filename}",
-        }
-        
-        # Add asset paths if they exist
-        if os.path.exists(png_path):
-            diagram_data["png"] = f"/{png_path}"
-        if os.path.exists(svg_path):
-            diagram_data["svg"] = f"/{svg_path}"
-        if os.path.exists(thumb_path):
-            diagram_data["thumbnail"] = f"/{thumb_path}"
-        else:
-            diagram_data["thumbnail"] = diagram_data.get("png", "/assets/img/diagram-placeholder.png")
-        
-        diagrams.append(diagram_data)
-    
-    return sorted(diagrams, key=lambda x: x["id"])
+# Extra formats written by the converters' export stage
+EXPORT_FORMATS = ["webp", "avif", "pdf"]
+# Best first: browsers use the first <source> type they support
+PICTURE_SOURCES = [("avif", "image/avif"), ("webp", "image/webp")]
+RESPONSIVE_FORMATS = ["avif", "webp", "png"]
+RESPONSIVE_SUFFIX = re.compile(r"-(\d+)w$")
+# The diagram column is at most about 1000px wide
+PICTURE_SIZES = "(max-width: 1000px) 100vw, 1000px"
+RELATED_LIMIT = 3
+# Candidates scored per category/tag group, centred on the diagram itself
+RELATED_WINDOW = 50
+# A shared category counts as much as this many shared tags
+CATEGORY_WEIGHT = 2
+# Search ranking: where a term appears and how much it counts
+SEARCH_FIELDS = [("title", 3), ("tags", 3), ("category", 2), ("description", 1)]
+SEARCH_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"a", "an", "and", "are", "as", "at", "by", "for", "from", "in", "into",
+             "is", "of", "on", "or", "the", "to", "with"}
+# (data key, button label, button class) in page order
+DOWNLOADS = [
+    ("png", "Download PNG", "btn-primary"),
+    ("svg", "Download SVG", "btn-secondary"),
+    ("pdf", "Download PDF", "btn-secondary"),
+    ("drawio", "Download Source (.drawio)", "btn-outline"),
+]
 
-def generate_individual_pages(diagrams):
-    """Generate individual pages for each diagram"""
-    for diagram in diagrams:
-        page_content = f"""---
+# Compiled once, filled in per diagram. Styling lives in assets/css/diagram.css,
+# which the diagram layout links, so pages carry no CSS of their own.
+PAGE_TEMPLATE = Template("""---
 layout: diagram
-title: "{diagram['title']}"
-description: "{diagram['description']}"
-category: "{diagram['category']}"
-complexity: "{diagram['complexity']}"
-tags: {diagram['tags']}
-permalink: /diagrams/{diagram['id']}/
+title: $title_json
+description: $description_json
+category: $category_json
+complexity: $complexity_json
+tags: $tags_json
+permalink: /diagrams/$id/
+diagram_id: $id
+prev: $prev
+next: $next
 ---
 
-# {diagram['title']}
+# $title
 
-{diagram['description']}
+$description
 
 ## Diagram Details
 
-- **Category**: {diagram['category']}
-- **Complexity**: {diagram['complexity']}
-- **Tags**: {', '.join(diagram['tags'])}
+- **Category**: $category
+- **Complexity**: $complexity
+- **Tags**: $tag_list
 
 ## View Options
 
 <div class="diagram-viewer">
   <div class="diagram-image">
-"""
-        
-        if diagram.get('png'):
-            page_content += f"""    <img src="{diagram['png']}" alt="{diagram['title']}" style="max-width: 100%; height: auto; border: 1px solid #ddd; border-radius: 8px;">
-"""
-        
-        page_content += """  </div>
+$image  </div>
   
   <div class="diagram-actions">
     <h3>Download Options</h3>
     <div class="download-buttons">
-"""
-        
-        if diagram.get('png'):
-            page_content += f"""      <a href="{diagram['png']}" download class="btn btn-primary">Download PNG</a>
-"""
-        if diagram.get('svg'):
-            page_content += f"""      <a href="{diagram['svg']}" download class="btn btn-secondary">Download SVG</a>
-"""
-        if diagram.get('drawio'):
-            page_content += f"""      <a href="{diagram['drawio']}" download class="btn btn-outline">Download Source (.drawio)</a>
-"""
-        
-        page_content += """    </div>
+$downloads    </div>
     
     <h3>How to Edit</h3>
     <ol>
@@ -173,132 +98,390 @@ permalink: /diagrams/{diagram['id']}/
   </div>
 </div>
 
-## Related Diagrams
-
-{% assign related_diagrams = site.data.diagrams | where_exp: "item", "item.category == page.category and item.id != page.title" %}
-{% for related in related_diagrams limit:3 %}
-- [{{ related.title }}]({{ related.url }}) - {{ related.description }}
-{% endfor %}
-
-<style>
-.diagram-viewer {
-  display: flex;
-  flex-wrap: wrap;
-  gap: 20px;
-  margin: 20px 0;
-}
-
-.diagram-image {
-  flex: 2;
-  min-width: 300px;
-}
-
-.diagram-actions {
-  flex: 1;
-  min-width: 250px;
-  background: #f8f9fa;
-  padding: 20px;
-  border-radius: 8px;
-}
-
-.download-buttons {
-  display: flex;
-  flex-direction: column;
-  gap: 10px;
-  margin: 15px 0;
-}
-
-.btn {
-  display: inline-block;
-  padding: 10px 15px;
-  text-decoration: none;
-  border-radius: 4px;
-  text-align: center;
-  font-weight: bold;
-  transition: all 0.3s ease;
-}
-
-.btn-primary {
-  background: #007cba;
-  color: white;
-}
-
-.btn-primary:hover {
-  background: #005a8b;
-  color: white;
-}
-
-.btn-secondary {
-  background: #6c757d;
-  color: white;
-}
-
-.btn-secondary:hover {
-  background: #545b62;
-  color: white;
-}
-
-.btn-outline {
-  background: transparent;
-  color: #007cba;
-  border: 2px solid #007cba;
-}
-
-.btn-outline:hover {
-  background: #007cba;
-  color: white;
-}
-
-@media (max-width: 768px) {{
-  .diagram-viewer {{
-    flex-direction: column;
-  }}
-}}
-</style>
+$related""")
+
+def ensure_directories():
+    """Create necessary directories"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(f"{OUTPUT_DIR}/pages", exist_ok=True)
+
+def write_if_changed(path, content):
+    """Write content unless the file already holds exactly that
+
+    Leaving identical files alone keeps their mtimes, so Jekyll's
+    incremental builds only regenerate what actually changed. New content
+    goes to a temporary file that is renamed over the old one, so a
+    running `jekyll serve` never reads a half-written file. Returns True
+    when the file was written.
+    """
+    data = content.encode('utf-8')
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def dump_yaml(data, **options):
+    """YAML text for a data file, via libyaml when it is installed"""
+    return yaml.dump(data, Dumper=YAML_DUMPER, default_flow_style=False,
+                     allow_unicode=True, **options)
+
+def summarize_catalog(diagrams):
+    """Categories and tags with their diagrams and counts, in one pass"""
+    categories, tags = {}, {}
+    for diagram in diagrams:
+        names = [(categories, diagram['category'])] + [(tags, tag) for tag in diagram['tags']]
+        for groups, name in names:
+            group = groups.get(name)
+            if group is None:
+                group = groups[name] = {'name': name, 'diagrams': [], 'count': 0}
+            group['diagrams'].append(diagram['id'])
+            group['count'] += 1
+    return categories, tags
+
+def remove_stale_pages(diagrams):
+    """Delete generated pages whose diagram no longer exists"""
+    live = {f"{diagram['id']}.md" for diagram in diagrams}
+    removed = []
+    for page_path in sorted(Path(f"{OUTPUT_DIR}/pages").glob("*.md")):
+        if page_path.name in live:
+            continue
+        # Only pages this script generated; hand-written ones are kept
+        with open(page_path, 'r', encoding='utf-8') as f:
+            if f.read(64).startswith("---\nlayout: diagram\n"):
+                page_path.unlink()
+                removed.append(page_path)
+    return removed
+
+def scan_diagrams(store=None, tracer=instrumentation.DISABLED):
+    """Scan for diagram files and generate metadata
+    
+    Titles, categories and tags come from the <name>.meta.yml sidecars
+    next to each .drawio file (see diagram_metadata.py).
+    """
+    diagrams = []
+    
+    if not os.path.exists(DIAGRAM_SOURCE_DIR):
+        print(f"Warning: {DIAGRAM_SOURCE_DIR} does not exist")
+        return diagrams
+    
+    store = store or MetadataStore(DIAGRAM_SOURCE_DIR)
+    for base_name in store.stems():
+        with tracer.item(base_name, cat="scan_diagram"):
+            diagrams.append(scan_diagram(store, base_name))
+    
+    return sorted(diagrams, key=lambda x: x["id"])
+
+def scan_diagram(store, base_name):
+    """Data entry for one diagram: metadata plus the assets that exist"""
+    filename = f"{base_name}.drawio"
+    
+    # Get metadata
+    info = store.get(base_name)
+    
+    # Check for generated assets
+    png_path = f"{ASSETS_DIR}/png/{base_name}.png"
+    svg_path = f"{ASSETS_DIR}/svg/{base_name}.svg" 
+    thumb_path = f"{ASSETS_DIR}/png/{base_name}_thumb.png"
+    
+    diagram_data = {
+        "id": base_name,
+        "title": info["title"],
+        "description": info["description"],
+        "category": info["category"],
+        "complexity": info["complexity"],
+        "tags": info["tags"],
+        "source_file": f"{DIAGRAM_SOURCE_DIR}/{filename}",
+        "url": f"/diagrams/{base_name}/",
+        "drawio": f"/{DIAGRAM_SOURCE_DIR}/{filename}",
+    }
+    
+    # Add asset paths if they exist
+    if os.path.exists(png_path):
+        diagram_data["png"] = f"/{png_path}"
+    if os.path.exists(svg_path):
+        diagram_data["svg"] = f"/{svg_path}"
+    for fmt in EXPORT_FORMATS:
+        export_path = f"{ASSETS_DIR}/{fmt}/{base_name}.{fmt}"
+        if os.path.exists(export_path):
+            diagram_data[fmt] = f"/{export_path}"
+    
+    # Intrinsic size and responsive variants for <picture> markup
+    size = image_size(png_path) if os.path.exists(png_path) else None
+    if size:
+        diagram_data["width"], diagram_data["height"] = size
+    srcset = {fmt: build_srcset(fmt, base_name, size and size[0]) for fmt in RESPONSIVE_FORMATS}
+    srcset = {fmt: value for fmt, value in srcset.items() if value}
+    if srcset:
+        diagram_data["srcset"] = srcset
+    if os.path.exists(thumb_path):
+        diagram_data["thumbnail"] = f"/{thumb_path}"
+    else:
+        diagram_data["thumbnail"] = diagram_data.get("png", "/assets/img/diagram-placeholder.png")
+    
+    return diagram_data
+
+def image_size(path):
+    """(width, height) of a PNG, read from its header; None if not a PNG"""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    if header[:8] != b'\x89PNG\r\n\x1a\n':
+        return None
+    return struct.unpack('>II', header[16:24])
+
+def build_srcset(fmt, base_name, full_width):
+    """srcset for one format: the responsive widths plus the full-size file"""
+    fmt_dir = Path(ASSETS_DIR) / fmt
+    candidates = []
+    for path in fmt_dir.glob(f"{base_name}-*w.{fmt}"):
+        match = RESPONSIVE_SUFFIX.search(path.stem)
+        if match and path.stem[:match.start()] == base_name:
+            candidates.append((int(match.group(1)), path))
+    full_path = fmt_dir / f"{base_name}.{fmt}"
+    if full_width and full_path.exists():
+        candidates.append((full_width, full_path))
+    return ", ".join(f"/{path.as_posix()} {width}w" for width, path in sorted(candidates))
+
+def site_url(path):
+    """Liquid for a root-relative URL with the site's baseurl in front
+
+    Plain root-relative links skip the baseurl of a project site, so every
+    URL written into a page goes through relative_url.
+    """
+    return f"{{{{ '{path}' | relative_url }}}}"
+
+def site_srcset(srcset):
+    """site_url applied to every candidate of a srcset"""
+    candidates = (candidate.rsplit(" ", 1) for candidate in srcset.split(", "))
+    return ", ".join(f"{site_url(url)} {width}" for url, width in candidates)
+
+def picture_markup(diagram):
+    """<picture> with AVIF/WebP sources and a PNG fallback, linking to the full-size image"""
+    srcset = diagram.get('srcset', {})
+    size_attrs = ""
+    if diagram.get('width'):
+        size_attrs = f' width="{diagram["width"]}" height="{diagram["height"]}"'
+    markup = f"""    <a href="{site_url(diagram.get('svg') or diagram['png'])}" class="diagram-full-size">
+    <picture>
+"""
+    for fmt, mime in PICTURE_SOURCES:
+        if srcset.get(fmt):
+            markup += f"""      <source type="{mime}" srcset="{site_srcset(srcset[fmt])}" sizes="{PICTURE_SIZES}">
+"""
+    png_srcset = (f' srcset="{site_srcset(srcset["png"])}" sizes="{PICTURE_SIZES}"'
+                  if srcset.get('png') else "")
+    markup += f"""      <img src="{site_url(diagram['png'])}"{png_srcset}{size_attrs} alt="{diagram['title']}" decoding="async">
+    </picture>
+    </a>
+"""
+    return markup
+
+def download_links(diagram):
+    """Download buttons for the formats this diagram has"""
+    links = ""
+    for key, label, style in DOWNLOADS:
+        if diagram.get(key):
+            links += f"""      <a href="{site_url(diagram[key])}" download class="btn {style}">{label}</a>
+"""
+    return links
+
+def link_diagrams(diagrams, categories, tags):
+    """Prev/next neighbours and related diagrams for every page, computed once
+
+    Related diagrams share the category or tags, best match first. Only
+    diagrams reachable through the category/tag groups from
+    summarize_catalog are scored, and each group contributes at most
+    RELATED_WINDOW of its members (the ones nearest the diagram in catalog
+    order), so the work grows linearly with the catalog even when one
+    category or tag covers most of it.
+    """
+    by_id = {diagram['id']: diagram for diagram in diagrams}
+    positions = {}
+    
+    def window(kind, group, diagram_id):
+        members = group['diagrams']
+        if len(members) <= RELATED_WINDOW:
+            return members
+        key = (kind, group['name'])
+        if key not in positions:
+            positions[key] = {member: index for index, member in enumerate(members)}
+        start = positions[key][diagram_id] - RELATED_WINDOW // 2
+        start = max(0, min(start, len(members) - RELATED_WINDOW))
+        return members[start:start + RELATED_WINDOW]
+    
+    links = {}
+    for index, diagram in enumerate(diagrams):
+        scores = {}
+        for other in window('category', categories[diagram['category']], diagram['id']):
+            scores[other] = scores.get(other, 0) + CATEGORY_WEIGHT
+        for tag in diagram['tags']:
+            for other in window('tag', tags[tag], diagram['id']):
+                scores[other] = scores.get(other, 0) + 1
+        scores.pop(diagram['id'], None)
+        best = sorted(scores, key=lambda other: (-scores[other], other))[:RELATED_LIMIT]
+        links[diagram['id']] = {
+            'prev': diagrams[index - 1] if index > 0 else None,
+            'next': diagrams[index + 1] if index + 1 < len(diagrams) else None,
+            'related': [by_id[other] for other in best],
+        }
+    return links
+
+def nav_link(diagram):
+    """Front matter value for a prev/next link (JSON is valid YAML)"""
+    if diagram is None:
+        return "null"
+    return json.dumps({"title": diagram['title'], "url": diagram['url']})
+
+def related_section(related):
+    """Markdown list of related diagrams, empty when there are none"""
+    if not related:
+        return ""
+    section = "## Related Diagrams\n\n"
+    for diagram in related:
+        section += f"- [{diagram['title']}]({site_url(diagram['url'])}) - {diagram['description']}\n"
+    return section
+
+def search_terms(text):
+    """Lowercased index terms of a string, without stopwords"""
+    return [term for term in SEARCH_TOKEN.findall(text.lower()) if term not in STOPWORDS]
+
+def build_search_index(diagrams):
+    """Inverted index for the client-side search, sharded by first character
+
+    Returns (docs, shards). docs holds only what a result line shows;
+    each shard maps a term to a flat [doc, weight, doc, weight, ...]
+    postings list, so the browser only fetches the shards a query needs.
+    """
+    docs = []
+    shards = {}
+    for number, diagram in enumerate(diagrams):
+        docs.append([diagram['title'], diagram['url'], diagram['category']])
+        weights = {}
+        for field, weight in SEARCH_FIELDS:
+            value = diagram[field]
+            text = " ".join(value) if isinstance(value, list) else value
+            for term in search_terms(text):
+                weights[term] = weights.get(term, 0) + weight
+        for term, weight in weights.items():
+            shards.setdefault(term[0], {}).setdefault(term, []).extend([number, weight])
+    return docs, shards
+
+def write_search_index(diagrams):
+    """Write the search shards next to the pages; returns how many files changed"""
+    docs, shards = build_search_index(diagrams)
+    compact = {'separators': (',', ':'), 'sort_keys': True, 'ensure_ascii': False}
+    changed = write_if_changed(f"{SEARCH_DIR}/docs.json",
+                               json.dumps({'docs': docs, 'shards': sorted(shards)}, **compact))
+    for key, terms in shards.items():
+        changed += write_if_changed(f"{SEARCH_DIR}/{key}.json", json.dumps(terms, **compact))
+    for shard_path in Path(SEARCH_DIR).glob("*.json"):
+        if shard_path.stem != "docs" and shard_path.stem not in shards:
+            shard_path.unlink()
+            changed += 1
+    return changed
+
+def generate_individual_pages(diagrams, categories, tags):
+    """Generate individual pages for each diagram; returns how many changed"""
+    changed = 0
+    links = link_diagrams(diagrams, categories, tags)
+    for diagram in diagrams:
+        link = links[diagram['id']]
+        # Responsive rasters keep the page light; the vector render is one click away
+        if diagram.get('png'):
+            image = picture_markup(diagram)
+        elif diagram.get('svg'):
+            image = f"""    <img src="{site_url(diagram['svg'])}" alt="{diagram['title']}">
 """
+        else:
+            image = ""
+        
+        page_content = PAGE_TEMPLATE.substitute(
+            id=diagram['id'],
+            title=diagram['title'],
+            description=diagram['description'],
+            category=diagram['category'],
+            complexity=diagram['complexity'],
+            # Front matter values are JSON, which YAML reads as-is, so quotes
+            # and colons in the metadata cannot break the page
+            title_json=json.dumps(diagram['title']),
+            description_json=json.dumps(diagram['description']),
+            category_json=json.dumps(diagram['category']),
+            complexity_json=json.dumps(diagram['complexity']),
+            tags_json=json.dumps(diagram['tags']),
+            tag_list=', '.join(diagram['tags']),
+            image=image,
+            downloads=download_links(diagram),
+            prev=nav_link(link['prev']),
+            next=nav_link(link['next']),
+            related=related_section(link['related']),
+        )
         
         # Write the page file
         page_path = f"{OUTPUT_DIR}/pages/{diagram['id']}.md"
-        os.makedirs(os.path.dirname(page_path), exist_ok=True)
-        with open(page_path, 'w') as f:
-            f.write(page_content)
+        changed += write_if_changed(page_path, page_content)
+    return changed
 
-def main():
-    """Main function"""
-    print("Generating diagram index...")
+def write_catalog(diagrams, tracer=instrumentation.DISABLED):
+    """Write data files, pages and search index for a scanned catalog
     
-    ensure_directories()
-    diagrams = scan_diagrams()
+    Only files whose content changed are touched. Prints a summary.
+    """
+    with tracer.stage("summarize"):
+        categories, tags = summarize_catalog(diagrams)
     
-    # Write diagrams data file for Jekyll
-    diagrams_yaml_path = f"{DATA_DIR}/diagrams.yml"
-    with open(diagrams_yaml_path, 'w') as f:
-        yaml.dump(diagrams, f, default_flow_style=False, sort_keys=False)
+    # Write the data files for Jekyll
+    with tracer.stage("data files"):
+        data_files = {
+            f"{DATA_DIR}/diagrams.yml": dump_yaml(diagrams, sort_keys=False),
+            f"{DATA_DIR}/diagram_categories.yml": dump_yaml(list(categories.values())),
+            f"{DATA_DIR}/diagram_tags.yml": dump_yaml(list(tags.values())),
+        }
+        data_changed = sum(write_if_changed(path, text) for path, text in data_files.items())
     
     # Generate individual diagram pages
-    generate_individual_pages(diagrams)
-    
-    # Create categories data
-    categories = {}
-    for diagram in diagrams:
-        category = diagram['category']
-        if category not in categories:
-            categories[category] = {
-                'name': category,
-                'diagrams': [],
-                'count': 0
-            }
-        categories[category]['diagrams'].append(diagram['id'])
-        categories[category]['count'] += 1
-    
-    categories_yaml_path = f"{DATA_DIR}/diagram_categories.yml"
-    with open(categories_yaml_path, 'w') as f:
-        yaml.dump(list(categories.values()), f, default_flow_style=False)
+    with tracer.stage("pages", diagrams=len(diagrams)):
+        pages_changed = generate_individual_pages(diagrams, categories, tags)
+        removed = remove_stale_pages(diagrams)
+    with tracer.stage("search index"):
+        search_changed = write_search_index(diagrams)
+    tracer.count("files updated", data_changed + pages_changed + search_changed + len(removed))
     
     print(f"Generated index for {len(diagrams)} diagrams")
-    print(f"Created {len(categories)} categories")
-    print(f"Data files written to {DATA_DIR}/")
-    print(f"Individual pages written to {OUTPUT_DIR}/pages/")
+    print(f"Created {len(categories)} categories and {len(tags)} tags")
+    print(f"Data files in {DATA_DIR}/: {data_changed} updated, "
+          f"{len(data_files) - data_changed} unchanged")
+    print(f"Pages in {OUTPUT_DIR}/pages/: {pages_changed} updated, "
+          f"{len(diagrams) - pages_changed} unchanged, {len(removed)} removed")
+    print(f"Search index in {SEARCH_DIR}/: {search_changed} files updated")
+    for page_path in removed:
+        print(f"  Removed page for deleted diagram: {page_path.name}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the diagram catalog for the Jekyll site")
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    tracer = instrumentation.from_args('generate-diagram-index', args)
+    print("Generating diagram index...")
+    
+    ensure_directories()
+    store = MetadataStore(DIAGRAM_SOURCE_DIR)
+    with tracer.stage("scan"):
+        diagrams = scan_diagrams(store, tracer)
+        store.save()
+    write_catalog(diagrams, tracer)
+    tracer.finish()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
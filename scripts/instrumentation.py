@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Stage timings, counters and profiling shared by the build and check scripts
+A Tracer records nested stages, per-item timings and counters and writes
+them as a Chrome trace (open it in chrome://tracing or ui.perfetto.dev).
+Tracing is off unless --trace FILE or TRACE_FILE is set; --profile or
+TRACE_PROFILE adds a cProfile or tracemalloc capture to the run
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+import tracemalloc
+from pathlib import Path
+
+TRACE_ENV = "TRACE_FILE"
+PROFILE_ENV = "TRACE_PROFILE"
+PROFILERS = ["cprofile", "tracemalloc"]
+TOP_ENTRIES = 15
+
+
+def now_us():
+    """Monotonic clock in microseconds, comparable across worker processes"""
+    return time.perf_counter_ns() // 1000
+
+
+class Tracer:
+    """Collects trace events for one script run; a no-op while disabled"""
+
+    def __init__(self, name, path=None, profile=None):
+        if profile and profile not in PROFILERS:
+            raise ValueError(f"unknown profiler {profile!r} (choose from {', '.join(PROFILERS)})")
+        self.name = name
+        self.path = self._resolve(path) if path else None
+        self.profile = profile or None
+        self.enabled = bool(path or profile)
+        self.events = []
+        self.counters = {}
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.started = now_us()
+        self.profiler = None
+        if self.profile == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profile == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _resolve(self, path):
+        """A directory (or a path ending in a separator) gets <name>.trace.json"""
+        if str(path).endswith(('/', os.sep)) or Path(path).is_dir():
+            return Path(path) / f"{self.name}.trace.json"
+        return Path(path)
+
+    def record(self, name, start, duration, cat='item', pid=None, tid=None, **args):
+        """Add a finished span measured elsewhere (e.g. in a worker process)"""
+        if not self.enabled:
+            return
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': start, 'dur': duration,
+                 'pid': pid or self.pid, 'tid': tid or threading.get_native_id()}
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+            total = self.totals.setdefault((cat, name if cat == 'stage' else cat),
+                                           {'count': 0, 'us': 0, 'max_us': 0, 'slowest': None})
+            total['count'] += 1
+            total['us'] += duration
+            if duration >= total['max_us']:
+                total['max_us'], total['slowest'] = duration, name
+
+    @contextlib.contextmanager
+    def span(self, name, cat, **args):
+        if not self.enabled:
+            yield
+            return
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        start = now_us()
+        try:
+            yield
+        finally:
+            if memory is not None:
+                args['allocated_bytes'] = tracemalloc.get_traced_memory()[0] - memory
+            self.record(name, start, now_us() - start, cat, **args)
+
+    def stage(self, name, **args):
+        """Time a pipeline stage: `with tracer.stage("scan"): ...`"""
+        return self.span(name, 'stage', **args)
+
+    def item(self, name, cat='item', **args):
+        """Time one unit of work; items are summarised per category"""
+        return self.span(name, cat, **args)
+
+    def count(self, name, value=1):
+        """Increment a counter; its running value is kept in the trace"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append({'name': name, 'ph': 'C', 'ts': now_us(), 'pid': self.pid,
+                                'args': {'value': self.counters[name]}})
+
+    def finish(self):
+        """Stop profiling, write the trace and print a timing summary to stderr"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        wall = now_us() - self.started
+        other = {'script': self.name, 'argv': sys.argv, 'wall_ms': wall / 1000,
+                 'counters': self.counters}
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.profiler is not None:
+            self.profiler.disable()
+            prof_path = (self.path.with_suffix('.prof') if self.path
+                         else Path(f"{self.name}.prof"))
+            self.profiler.dump_stats(prof_path)
+            other['cprofile'] = str(prof_path)
+            stats = pstats.Stats(self.profiler, stream=sys.stderr)
+            stats.sort_stats('cumulative').print_stats(TOP_ENTRIES)
+        elif self.profile == 'tracemalloc':
+            snapshot = tracemalloc.take_snapshot()
+            other['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            other['top_allocations'] = [
+                {'where': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]
+            ]
+            tracemalloc.stop()
+        if self.path:
+            metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                         'args': {'name': self.name}}]
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms',
+                           'otherData': other}, f)
+        self.print_summary(wall, other)
+
+    def print_summary(self, wall, other):
+        out = sys.stderr
+        print(f"\n⏱️  {self.name}: {wall / 1e6:.2f}s", file=out)
+        for (cat, name), total in self.totals.items():
+            if cat == 'stage':
+                print(f"   {name:<28} {total['us'] / 1e6:8.3f}s", file=out)
+            else:
+                mean = total['us'] / total['count'] / 1000
+                print(f"   {name:<28} {total['us'] / 1e6:8.3f}s  {total['count']} items, "
+                      f"mean {mean:.1f}ms, slowest {total['slowest']} "
+                      f"({total['max_us'] / 1000:.1f}ms)", file=out)
+        for name, value in self.counters.items():
+            print(f"   {name:<28} {value}", file=out)
+        if 'peak_bytes' in other:
+            print(f"   peak traced memory           {other['peak_bytes'] / 1e6:.1f} MB", file=out)
+        if self.path:
+            print(f"   trace written to {self.path}", file=out)
+
+
+def add_arguments(parser):
+    """--trace and --profile options, defaulting to TRACE_FILE / TRACE_PROFILE"""
+    parser.add_argument('--trace', metavar='FILE', default=os.getenv(TRACE_ENV) or None,
+                        help=f"write a Chrome trace of the run (or set {TRACE_ENV}); "
+                             "a directory gets <script>.trace.json")
+    parser.add_argument('--profile', choices=PROFILERS, default=os.getenv(PROFILE_ENV) or None,
+                        help=f"also capture a cProfile or tracemalloc profile (or set {PROFILE_ENV})")
+
+
+def from_args(name, args):
+    return Tracer(name, args.trace, args.profile)
+
+
+def from_env(name):
+    return Tracer(name, os.getenv(TRACE_ENV) or None, os.getenv(PROFILE_ENV) or None)
+
+
+# Default for library calls made without a tracer
+DISABLED = Tracer("disabled")
@@ -8,14 +8,38 @@ Simple integration test for GitHub Pages site
 Usage:
   BASE_URL=https://cloudshare360.github.io/aws-devops-gitlab-cicd-spring-boot-angular-fargate/ \
     python3 scripts/integration_tests/check_site.py
+
+Behaviour is configured through environment variables (URL discovery,
+offline SITE_DIR checks, budgets, link checking, the asset audit, response
+caching, the load test, tracing); see README.md in this directory.
 """
 import os
+import re
 import sys
 import time
 import json
-from urllib.parse import urljoin
+import mmap
+import random
+import codecs
+import fnmatch
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote, urljoin, urldefrag, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Shared with the build scripts one directory up (part of the sparse CI checkout)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import instrumentation
+# The local Pages emulator next to this script owns the _config.yml lookup
+from pages_server import CONFIG_FILE, config_baseurl, normalize_baseurl
 
 DEFAULT_PATHS = [
     "",  # homepage (redirects to learning path)
@@ -35,42 +59,1094 @@ EXPECTED_MARKERS = [
 
 TIMEOUT = int(os.getenv("TIMEOUT", "10"))
 RETRIES = int(os.getenv("RETRIES", "5"))
-SLEEP_BETWEEN = int(os.getenv("RETRY_DELAY", "3"))
+SLEEP_BETWEEN = float(os.getenv("RETRY_DELAY", "3"))
+MAX_SLEEP = float(os.getenv("MAX_RETRY_DELAY", "30"))
+EXPECTED_VERSION = os.getenv("EXPECTED_VERSION", "")
+VERSION_PATH = os.getenv("VERSION_PATH", "version.json")
+CONCURRENCY = max(1, int(os.getenv("CONCURRENCY", "8")))
+DISCOVER = os.getenv("DISCOVER", "").lower()
+MAX_DEPTH = int(os.getenv("MAX_DEPTH", "3"))
+MAX_PAGES = int(os.getenv("MAX_PAGES", "500"))
+CHUNK_SIZE = 64 * 1024
+SITE_DIR = os.getenv("SITE_DIR", "")
+MMAP_THRESHOLD = 256 * 1024
+BUDGET_FILE = os.getenv("BUDGET_FILE", "")
+PERCENTILES = (50, 95, 99)
+BUDGET_METRICS = ("connect_ms", "ttfb_ms", "total_ms",
+                  "transfer_bytes", "decoded_bytes", "page_bytes")
+CHECK_LINKS_MODE = os.getenv("CHECK_LINKS", "").lower()
+CHECK_LINKS = CHECK_LINKS_MODE in ("1", "true", "yes", "report")
+# CHECK_LINKS=report lists broken links without failing the run
+LINKS_REPORT_ONLY = CHECK_LINKS_MODE == "report"
+CACHE_FILE = os.getenv("CACHE_FILE", "")
+CACHE_VERSION = 1
+CACHE_KEEP_DAYS = 30
+AUDIT = os.getenv("AUDIT", "").lower() in ("1", "true", "yes")
+LOAD_REQUESTS = int(os.getenv("LOAD_REQUESTS", "0"))
+LOAD_CONCURRENCY = max(1, int(os.getenv("LOAD_CONCURRENCY", str(CONCURRENCY))))
+AUDIT_TOP = int(os.getenv("AUDIT_TOP", "10"))
+# <link rel> values whose href the browser downloads with the page
+LOADED_RELS = {"stylesheet", "icon", "shortcut", "apple-touch-icon",
+               "preload", "modulepreload", "manifest"}
+# Responses of these types compress well and should not arrive as identity
+COMPRESSIBLE_TYPES = ("text/", "javascript", "json", "xml", "svg")
+MIN_COMPRESSIBLE_BYTES = 1024
+# Stand-in origin for SITE_DIR builds, so links resolve as they would online
+LOCAL_ORIGIN = "http://site.invalid"
+# Schemes that never point into the site
+SKIPPED_SCHEMES = ("mailto:", "tel:", "javascript:", "data:")
+MARKER_PATTERNS = {
+    m: re.compile(re.escape(m.encode("utf-8")), re.IGNORECASE)
+    for m in EXPECTED_MARKERS
+}
+TRACER = instrumentation.from_env("check_site")
+
+# Linked files with these extensions are assets, not pages to crawl
+NON_PAGE_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf",
+    ".css", ".js", ".json", ".xml", ".txt", ".zip", ".drawio", ".mmd",
+)
+
+
+# Time spent opening connections (DNS + TCP + TLS) by the current thread
+_connect_time = threading.local()
+
+
+def _record_connect(seconds: float):
+    _connect_time.total = getattr(_connect_time, "total", 0.0) + seconds
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report how long they took to open"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class LinkCollector(HTMLParser):
+    """Collect links, anchor ids and subresources while the page is streamed in
+
+    Subresources are grouped: every URL a single <img> or <picture> might
+    load forms one group, since the browser downloads only one of them.
+    """
+
+    def __init__(self, page_url: str):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.links = []
+        self.hrefs = []
+        self.anchors = set()
+        self.resources = []
+        self._picture = None
+
+    def _urls(self, *values):
+        urls = []
+        for value in values:
+            value = (value or "").strip()
+            if value and not value.lower().startswith(SKIPPED_SCHEMES):
+                urls.append(urljoin(self.page_url, value))
+        return urls
+
+    def _srcset(self, srcset):
+        # "a.png 480w, b.png 960w": the URL is the first word of each candidate
+        return [candidate.split()[0] for candidate in (srcset or "").split(",")
+                if candidate.strip()]
+
+    def _add_resources(self, urls):
+        if not urls:
+            return
+        if self._picture is not None:
+            self._picture.extend(urls)
+        else:
+            self.resources.append(urls)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if attrs.get("id"):
+            self.anchors.add(attrs["id"])
+        if tag == "a" and attrs.get("name"):
+            self.anchors.add(attrs["name"])
+        if tag in ("a", "area"):
+            href = (attrs.get("href") or "").strip()
+            if href and not href.lower().startswith(SKIPPED_SCHEMES):
+                self.links.append(urljoin(self.page_url, href))
+                self.hrefs.append(href)
+        elif tag == "picture":
+            self._picture = []
+        elif tag in ("img", "source"):
+            self._add_resources(self._urls(attrs.get("src"), *self._srcset(attrs.get("srcset"))))
+        elif tag == "link":
+            rels = set((attrs.get("rel") or "").lower().split())
+            if rels & LOADED_RELS:
+                self._add_resources(self._urls(attrs.get("href")))
+        elif tag in ("script", "video", "audio", "iframe", "embed"):
+            for url in self._urls(attrs.get("src"), attrs.get("poster")):
+                self._add_resources([url])
+
+    def handle_endtag(self, tag):
+        if tag == "picture" and self._picture is not None:
+            group, self._picture = self._picture, None
+            self._add_resources(group)
+
+
+def make_session(pool_size: int = CONCURRENCY) -> requests.Session:
+    """Create a keep-alive session whose connection pool fits the worker count"""
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch(url: str, session: requests.Session = None,
+          stream: bool = False, headers: dict = None) -> requests.Response:
+    getter = session.get if session is not None else requests.get
+    return getter(url, timeout=TIMEOUT, allow_redirects=True, stream=stream,
+                  headers=headers)
+
+
+class ResponseCache:
+    """Page validators and derived check results, kept on disk between runs
+
+    Disabled (every method a no-op) when no path is given.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path) if path else None
+        self.lock = threading.Lock()
+        self.entries = None
+        self.hits = 0
+
+    def _load(self) -> dict:
+        if self.entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            # Cached verdicts are only valid for the markers they were made with
+            if (data.get("version") != CACHE_VERSION
+                    or data.get("markers") != EXPECTED_MARKERS):
+                data = {}
+            self.entries = data.get("entries", {})
+        return self.entries
+
+    def get(self, url: str):
+        if self.path is None:
+            return None
+        with self.lock:
+            return self._load().get(url)
+
+    @staticmethod
+    def validators(entry) -> dict:
+        """Conditional request headers for a cached entry"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self, url: str):
+        with self.lock:
+            self.hits += 1
+            self.entries[url]["checked_at"] = time.time()
+
+    def store(self, url: str, res: requests.Response, details: dict,
+              collector: "LinkCollector"):
+        etag = res.headers.get("ETag")
+        last_modified = res.headers.get("Last-Modified")
+        if self.path is None or not (etag or last_modified):
+            return
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked_at": time.time(),
+            "status": res.status_code,
+            "final_url": res.url,
+            "has_markers": details["has_markers"],
+            "transfer_bytes": details["size"]["transfer_bytes"],
+            "decoded_bytes": details["size"]["decoded_bytes"],
+            "content_encoding": details["size"]["content_encoding"],
+            "links": collector.links,
+            "hrefs": collector.hrefs,
+            "anchors": sorted(collector.anchors),
+            "resources": collector.resources,
+        }
+        with self.lock:
+            self._load()[url] = entry
+
+    def save(self):
+        """Write the cache atomically, dropping entries unused for a while"""
+        if self.path is None or self.entries is None:
+            return
+        cutoff = time.time() - CACHE_KEEP_DAYS * 86400
+        entries = {url: entry for url, entry in self.entries.items()
+                   if entry.get("checked_at", 0) >= cutoff}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "markers": EXPECTED_MARKERS,
+                       "entries": entries}, f)
+        os.replace(tmp_path, self.path)
+
 
+RESPONSE_CACHE = ResponseCache(CACHE_FILE)
 
-def fetch(url: str) -> requests.Response:
-    return requests.get(url, timeout=TIMEOUT, allow_redirects=True)
 
+def cached_collector(entry: dict) -> LinkCollector:
+    """A LinkCollector holding what was parsed from a page last time"""
+    collector = LinkCollector(entry["final_url"])
+    collector.links = entry["links"]
+    collector.hrefs = entry["hrefs"]
+    collector.anchors = set(entry["anchors"])
+    collector.resources = entry["resources"]
+    return collector
 
-def check_url(base: str, path: str):
+
+def site_path(base: str, url: str):
+    """Return url relative to base, or None when it is outside the site"""
+    url, _ = urldefrag(url)
+    target, root = urlparse(url), urlparse(base)
+    if (target.scheme, target.netloc) != (root.scheme, root.netloc):
+        return None
+    if not target.path.startswith(root.path):
+        return None
+    path = target.path[len(root.path):]
+    if path == "index.html" or path.endswith("/index.html"):
+        path = path[:-len("index.html")]
+    return path
+
+
+def is_page(path: str) -> bool:
+    return not path.lower().endswith(NON_PAGE_EXTENSIONS)
+
+
+def read_text(res: requests.Response, parser: HTMLParser = None):
+    """Read a streamed response body, feeding each chunk to parser as it arrives
+
+    Returns the decoded text and its size in bytes after content decoding.
+    """
+    decoder = codecs.getincrementaldecoder(res.encoding or "utf-8")("replace")
+    chunks = []
+    size = 0
+    for raw in res.iter_content(chunk_size=CHUNK_SIZE):
+        size += len(raw)
+        chunk = decoder.decode(raw)
+        chunks.append(chunk)
+        if parser is not None:
+            parser.feed(chunk)
+    chunks.append(decoder.decode(b"", final=True))
+    if parser is not None:
+        parser.feed(chunks[-1])
+        parser.close()
+    return "".join(chunks), size
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def check_url(base: str, path: str, session: requests.Session = None,
+              links: set = None, validator: "LinkValidator" = None,
+              audit: "ResourceAudit" = None):
+    """Check one page; same-site page links are added to links when given
+
+    With a validator, the page's links and anchors are registered with it;
+    with an audit, its subresources are.
+    """
     url = urljoin(base, path)
-    res = fetch(url)
-    ok = (200 <= res.status_code < 300)
+    cached = RESPONSE_CACHE.get(url)
+    _connect_time.total = 0.0
+    start = time.perf_counter()
+    with fetch(url, session, stream=True,
+               headers=ResponseCache.validators(cached)) as res:
+        not_modified = cached is not None and res.status_code == 304
+        ok = not_modified or (200 <= res.status_code < 300)
+        details = {
+            "url": url,
+            "status": res.status_code,
+            "ok": ok,
+        }
+        decoded_bytes = 0
+        encoding = res.headers.get("Content-Encoding", "identity")
+        if not_modified:
+            # Unchanged since the last run: reuse what was derived from it
+            RESPONSE_CACHE.hit(url)
+            details["cached"] = True
+            details["has_markers"] = cached["has_markers"]
+            decoded_bytes = cached["decoded_bytes"]
+            encoding = cached["content_encoding"]
+            collector = cached_collector(cached)
+        elif ok:
+            collector = None
+            if (links is not None or validator is not None or audit is not None
+                    or RESPONSE_CACHE.path is not None):
+                collector = LinkCollector(res.url)
+            content, decoded_bytes = read_text(res, collector)
+            content = content.lower()
+            details["has_markers"] = {m: (m in content) for m in EXPECTED_MARKERS}
+        else:
+            decoded_bytes = len(res.content)
+            if validator is not None:
+                validator.add_target(url, res.status_code)
+        if ok:
+            if links is not None:
+                for link in collector.links:
+                    found = site_path(base, link)
+                    if found is not None and is_page(found):
+                        links.add(found)
+            if validator is not None:
+                validator.add_page(url, (url, collector.page_url), collector)
+            if audit is not None:
+                audit.add_page(details, collector.resources)
+        total = time.perf_counter() - start
+        details["timing"] = {
+            "connect_ms": ms(_connect_time.total),
+            # elapsed stops once a response's headers are parsed; add up every
+            # hop so redirects count towards the first byte of the final page
+            "ttfb_ms": ms(sum((r.elapsed for r in [*res.history, res]),
+                              timedelta()).total_seconds()),
+            "total_ms": ms(total),
+        }
+        details["size"] = {
+            "transfer_bytes": res.raw.tell(),
+            "decoded_bytes": decoded_bytes,
+            "content_encoding": encoding,
+        }
+        if not_modified:
+            # What a visitor without the page cached would download
+            details["size"]["cached_transfer_bytes"] = cached["transfer_bytes"]
+        if ok and not not_modified:
+            RESPONSE_CACHE.store(url, res, details, collector)
+    return ok, details
+
+
+def backoff_delay(attempt: int, base: float = SLEEP_BETWEEN,
+                  cap: float = MAX_SLEEP) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random"""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def served_version(base: str, session: requests.Session = None):
+    """Commit reported by the deployed version marker, or None"""
+    # The query string and no-cache get past CDN copies of the old marker
+    url = urljoin(base, VERSION_PATH) + f"?t={time.time_ns()}"
+    res = fetch(url, session, headers={"Cache-Control": "no-cache"})
+    if res.status_code != 200:
+        return None
+    try:
+        return res.json().get("commit")
+    except ValueError:
+        return None
+
+
+def same_commit(a: str, b: str) -> bool:
+    """Whether two SHAs, either possibly abbreviated, name the same commit"""
+    if not a or not b or min(len(a), len(b)) < 7:
+        return False
+    return a.startswith(b) or b.startswith(a)
+
+
+def is_ready(base: str, session: requests.Session = None,
+             expected: str = EXPECTED_VERSION):
+    """(ready, what was seen) for one readiness poll"""
+    if expected:
+        version = served_version(base, session)
+        return same_commit(version, expected), version
+    headers = ResponseCache.validators(RESPONSE_CACHE.get(base))
+    res = fetch(base, session, headers=headers)
+    return res.status_code in (200, 301, 302, 304), res.status_code
+
+
+def wait_until_live(base: str, session: requests.Session = None,
+                    expected: str = EXPECTED_VERSION) -> dict:
+    """Poll until the site (or the expected version of it) is served
+
+    Returns how the wait went; its "live" key says whether it succeeded.
+    """
+    start = time.perf_counter()
+    probe = {"live": False, "expected_version": expected or None}
+    for attempt in range(RETRIES):
+        probe["attempts"] = attempt + 1
+        try:
+            ready, probe["seen"] = is_ready(base, session, expected)
+        except Exception as e:
+            ready, probe["seen"] = False, str(e)
+        if ready:
+            probe["live"] = True
+            break
+        if attempt + 1 < RETRIES:
+            time.sleep(backoff_delay(attempt))
+    probe["waited_s"] = round(time.perf_counter() - start, 1)
+    return probe
+
+
+def safe_check(base: str, path: str, session: requests.Session = None,
+               links: set = None, validator: "LinkValidator" = None,
+               audit: "ResourceAudit" = None):
+    """Run check_url, turning exceptions into a failed check entry"""
+    try:
+        with TRACER.item(path or "/", cat="check_url"):
+            return check_url(base, path, session, links, validator, audit)
+    except Exception as e:
+        TRACER.count("errors")
+        return False, {
+            "url": urljoin(base, path),
+            "ok": False,
+            "error": str(e),
+        }
+
+
+def check_paths(base: str, paths, session: requests.Session,
+                concurrency: int = CONCURRENCY, validator: "LinkValidator" = None,
+                audit: "ResourceAudit" = None):
+    """Check paths on a bounded worker pool; results keep the input order"""
+    def check(path):
+        return safe_check(base, path, session, validator=validator, audit=audit)
+
+    if concurrency <= 1:
+        return [check(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(check, paths))
+
+
+def iter_sitemap(base: str, session: requests.Session, sitemap: str = "sitemap.xml"):
+    """Yield site paths from a sitemap (or sitemap index) while it downloads"""
+    parser = ET.XMLPullParser(events=("end",))
+    with fetch(urljoin(base, sitemap), session, stream=True) as res:
+        res.raise_for_status()
+        for chunk in res.iter_content(chunk_size=CHUNK_SIZE):
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                tag = elem.tag.rsplit("}", 1)[-1]
+                if tag == "loc" and elem.text:
+                    loc = elem.text.strip()
+                    # Sitemaps list production URLs; map them onto base's path
+                    path = site_path(base, loc)
+                    if path is None:
+                        path = site_path(urljoin(loc, urlparse(base).path),
+                                         loc)
+                    if path is None:
+                        continue
+                    if path.endswith(".xml"):
+                        yield from iter_sitemap(base, session, path)
+                    else:
+                        yield path
+                elem.clear()
+
+
+def discover_sitemap(base: str, session: requests.Session,
+                     max_pages: int = MAX_PAGES):
+    """DEFAULT_PATHS plus every unique sitemap page, up to max_pages"""
+    visited = set()
+    paths = []
+    sources = [DEFAULT_PATHS, iter_sitemap(base, session)]
+    for source in sources:
+        for path in source:
+            if len(paths) >= max_pages:
+                return paths
+            if path not in visited:
+                visited.add(path)
+                paths.append(path)
+    return paths
+
+
+def crawl(base: str, session: requests.Session, max_depth: int = MAX_DEPTH,
+          max_pages: int = MAX_PAGES, concurrency: int = CONCURRENCY,
+          validator: "LinkValidator" = None, audit: "ResourceAudit" = None):
+    """Breadth-first check of same-site pages reachable from DEFAULT_PATHS
+
+    Every page is fetched exactly once: the check and the link extraction
+    share the same streamed response, and the visited set stops re-queueing.
+    """
+    visited = set(DEFAULT_PATHS)
+    frontier = list(dict.fromkeys(DEFAULT_PATHS))
+    outcomes = []
+    depth = 0
+
+    def visit(path):
+        links = set()
+        ok, details = safe_check(base, path, session, links, validator, audit)
+        return ok, details, links
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while frontier and len(outcomes) < max_pages:
+            frontier = frontier[:max_pages - len(outcomes)]
+            next_frontier = []
+            for ok, details, links in pool.map(visit, frontier):
+                outcomes.append((ok, details))
+                if depth >= max_depth:
+                    continue
+                for link in sorted(links):
+                    if link not in visited:
+                        visited.add(link)
+                        next_frontier.append(link)
+            frontier = next_frontier
+            depth += 1
+    return outcomes
+
+
+def resolve_local(site_dir: Path, path: str):
+    """Map a site path onto the file Jekyll wrote for it, or None"""
+    target = site_dir / path
+    if path == "" or path.endswith("/"):
+        candidates = [target / "index.html"]
+    else:
+        candidates = [target, target.with_name(target.name + ".html"),
+                      target / "index.html"]
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def find_markers(file_path: Path) -> dict:
+    """Search a built page for EXPECTED_MARKERS without decoding it"""
+    size = file_path.stat().st_size
+    with open(file_path, "rb") as f:
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                return {m: bool(p.search(content))
+                        for m, p in MARKER_PATTERNS.items()}
+        content = f.read().lower()
+    return {m: (m.encode("utf-8") in content) for m in EXPECTED_MARKERS}
+
+
+def check_file(site_dir: Path, path: str, validator: "LinkValidator" = None,
+               audit: "ResourceAudit" = None):
+    """Offline counterpart of check_url; missing files report status 404"""
+    file_path = resolve_local(site_dir, path)
+    if file_path is None:
+        if validator is not None:
+            validator.add_target(urljoin(validator.base, path), 404)
+        return False, {
+            "url": (site_dir / path).as_uri(),
+            "status": 404,
+            "ok": False,
+        }
+    size = file_path.stat().st_size
     details = {
-        "url": url,
-        "status": res.status_code,
-        "ok": ok,
+        "url": file_path.as_uri(),
+        "status": 200,
+        "ok": True,
+        "has_markers": find_markers(file_path),
+        "size": {
+            "transfer_bytes": size,
+            "decoded_bytes": size,
+            "content_encoding": "identity",
+        },
     }
-    if ok:
-        content = res.text.lower()
-        details["has_markers"] = {m: (m in content) for m in EXPECTED_MARKERS}
-    return ok, details
+    if validator is not None or audit is not None:
+        virtual_base = (validator or audit).base
+        url = urljoin(virtual_base, path)
+        collector = parse_file(file_path, url)
+        if validator is not None:
+            validator.add_page(details["url"], (url,), collector)
+        if audit is not None:
+            audit.add_page(details, collector.resources)
+    return True, details
+
+
+def parse_file(file_path: Path, url: str) -> LinkCollector:
+    """Links and anchors of a built page, as if it were served from url"""
+    collector = LinkCollector(url)
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            collector.feed(chunk)
+    collector.close()
+    return collector
+
+
+def check_site_dir(site_dir: Path, paths, validator: "LinkValidator" = None,
+                   audit: "ResourceAudit" = None):
+    """Check paths against a local build, reporting like check_paths"""
+    outcomes = []
+    for path in paths:
+        try:
+            with TRACER.item(path or "/", cat="check_file"):
+                outcomes.append(check_file(site_dir, path, validator, audit))
+        except Exception as e:
+            outcomes.append((False, {
+                "url": (site_dir / path).as_uri(),
+                "ok": False,
+                "error": str(e),
+            }))
+    return outcomes
+
+
+def read_baseurl(config_file: Path = CONFIG_FILE) -> str:
+    """The site's baseurl from BASEURL or _config.yml, e.g. "/repo", or an empty string"""
+    baseurl = os.getenv("BASEURL")
+    if baseurl is None:
+        return config_baseurl(config_file)
+    return normalize_baseurl(baseurl)
+
+
+class LinkValidator:
+    """Validate internal links and #fragments, resolving each target once
+
+    Checked pages register their own anchors and outgoing links as they are
+    parsed; validate() then resolves only the targets no check has seen.
+    With site_dir set, targets are looked up in the local build instead.
+    """
+
+    def __init__(self, base: str, site_dir: Path = None):
+        self.base = base
+        self.site_dir = site_dir
+        self.lock = threading.Lock()
+        # site path -> (status, anchor ids or None for non-HTML, error)
+        self.targets = {}
+        self.links = []
+
+    def add_target(self, url: str, status: int, anchors: set = None,
+                   error: str = None):
+        path = site_path(self.base, url)
+        if path is not None:
+            with self.lock:
+                self.targets[path] = (status, anchors, error)
+
+    def add_page(self, source: str, urls, collector: LinkCollector):
+        """Record a checked page (under every URL it answered to) and its links"""
+        for url in urls:
+            self.add_target(url, 200, collector.anchors)
+        with self.lock:
+            self.links.extend((source, href, link) for href, link
+                              in zip(collector.hrefs, collector.links))
+
+    def resolve(self, path: str, need_anchors: bool,
+                session: requests.Session):
+        """(status, anchors, error) for a target no check has fetched"""
+        if self.site_dir is not None:
+            file_path = resolve_local(self.site_dir, path)
+            if file_path is None:
+                return 404, None, None
+            if need_anchors and file_path.suffix == ".html":
+                return 200, parse_file(file_path, urljoin(self.base, path)).anchors, None
+            return 200, None, None
+        url = urljoin(self.base, path)
+        try:
+            if not need_anchors:
+                res = session.head(url, timeout=TIMEOUT, allow_redirects=True)
+                if res.status_code not in (405, 501):
+                    return res.status_code, None, None
+            with fetch(url, session, stream=True) as res:
+                if not need_anchors or "html" not in res.headers.get("Content-Type", ""):
+                    return res.status_code, None, None
+                collector = LinkCollector(res.url)
+                read_text(res, collector)
+                return res.status_code, collector.anchors, None
+        except Exception as e:
+            return None, None, str(e)
 
+    def problem(self, href: str, link: str):
+        """Why a link is broken, or None when it is fine or leaves the site"""
+        path = site_path(self.base, link)
+        if path is None:
+            # Root-relative links that skip the baseurl break on project sites
+            if href.startswith("/") and not href.startswith("//"):
+                return f"outside baseurl {urlparse(self.base).path}"
+            return None
+        status, anchors, error = self.targets[path]
+        if error:
+            return error
+        if not 200 <= status < 400:
+            return f"HTTP {status}"
+        fragment = unquote(urldefrag(link)[1])
+        if fragment and fragment != "top" and anchors is not None \
+                and fragment not in anchors:
+            return f"missing anchor #{fragment}"
+        return None
 
-def wait_until_live(base: str) -> bool:
-    # Try homepage first with retries (propagation delay)
-    for i in range(RETRIES):
+    def validate(self, session: requests.Session = None,
+                 concurrency: int = CONCURRENCY) -> dict:
+        """Resolve unseen targets in parallel and group broken links by page"""
+        pending = {}
+        for _, _, link in self.links:
+            path = site_path(self.base, link)
+            if path is None or path in self.targets:
+                continue
+            fragment = urldefrag(link)[1]
+            pending[path] = pending.get(path, False) or fragment not in ("", "top")
+
+        def resolve(item):
+            path, need_anchors = item
+            with TRACER.item(path or "/", cat="resolve_link"):
+                return path, self.resolve(path, need_anchors, session)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for path, result in pool.map(resolve, pending.items()):
+                self.targets[path] = result
+
+        broken = {}
+        # Stable sort: pages in order, links in document order within each
+        for source, href, link in sorted(self.links, key=lambda entry: entry[0]):
+            reason = self.problem(href, link)
+            if reason:
+                broken.setdefault(source, []).append({"href": href, "reason": reason})
+        TRACER.count("links", len(self.links))
+        TRACER.count("broken links", sum(len(v) for v in broken.values()))
+        return {
+            "links": len(self.links),
+            "targets": len(self.targets),
+            "fetched": len(pending),
+            "broken": broken,
+        }
+
+
+class ResourceAudit:
+    """Weigh pages by their subresources, fetching each asset only once
+
+    Checked pages register their subresource groups; run() fetches every
+    unique URL on the worker pool and adds page_bytes to each page's check.
+    With site_dir set, same-site assets are sized from the local build and
+    other origins are skipped.
+    """
+
+    def __init__(self, base: str, site_dir: Path = None):
+        self.base = base
+        self.site_dir = site_dir
+        self.lock = threading.Lock()
+        self.pages = []
+        # url -> {"status", "transfer_bytes", "content_type", "content_encoding"}
+        self.assets = {}
+
+    def add_page(self, details: dict, groups):
+        with self.lock:
+            self.pages.append((details, groups))
+
+    def measure(self, url: str, session: requests.Session) -> dict:
+        """Status, transfer size and encoding of one asset"""
+        if self.site_dir is not None:
+            path = site_path(self.base, url)
+            if path is None:
+                return {"skipped": "other origin"}
+            file_path = resolve_local(self.site_dir, path)
+            if file_path is None:
+                return {"status": 404}
+            return {"status": 200, "transfer_bytes": file_path.stat().st_size,
+                    "content_encoding": "identity"}
         try:
-            res = fetch(base)
-            if res.status_code in (200, 301, 302):
-                return True
-        except Exception:
-            pass
-        time.sleep(SLEEP_BETWEEN)
-    return False
+            res = session.head(url, timeout=TIMEOUT, allow_redirects=True)
+            length = res.headers.get("Content-Length")
+            if res.status_code in (405, 501) or (res.ok and length is None):
+                # No size from HEAD: download it and count the bytes on the wire
+                with fetch(url, session, stream=True) as res:
+                    for _ in res.raw.stream(CHUNK_SIZE, decode_content=False):
+                        pass
+                    size = res.raw.tell()
+            else:
+                size = int(length or 0)
+        except Exception as e:
+            return {"error": str(e)}
+        return {
+            "status": res.status_code,
+            "transfer_bytes": size,
+            "content_type": res.headers.get("Content-Type", "").split(";")[0],
+            "content_encoding": res.headers.get("Content-Encoding", "identity"),
+        }
+
+    def same_site(self, url: str) -> bool:
+        """Whether an asset comes from the site's own origin"""
+        target, root = urlparse(url), urlparse(self.base)
+        return (target.scheme, target.netloc) == (root.scheme, root.netloc)
+
+    def run(self, session: requests.Session = None,
+            concurrency: int = CONCURRENCY) -> dict:
+        """Fetch every unique asset, then weigh pages and summarize
+
+        Failed assets from the site's own origin are listed under "failed";
+        failures on other origins, which the site does not control, go to
+        "offsite_failed" and only produce a warning.
+        """
+        urls = sorted({url for _, groups in self.pages
+                       for group in groups for url in group})
+
+        def measure(url):
+            with TRACER.item(url, cat="audit_asset"):
+                return url, self.measure(url, session)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            self.assets = dict(pool.map(measure, urls))
+
+        used_by = {}
+        weights = []
+        for details, groups in self.pages:
+            size = details.get("size", {})
+            html = size.get("cached_transfer_bytes", size.get("transfer_bytes", 0))
+            assets = 0
+            for group in groups:
+                assets += max(self.assets[url].get("transfer_bytes", 0) for url in group)
+                for url in group:
+                    used_by.setdefault(url, set()).add(details["url"])
+            details.setdefault("size", {})["page_bytes"] = html + assets
+            details["resources"] = sum(len(group) for group in groups)
+            weights.append({"url": details["url"], "page_bytes": html + assets,
+                            "html_bytes": html, "resources": details["resources"]})
+
+        # Only the site's own assets can fail the run; other origins are warnings
+        failed, offsite_failed = [], []
+        for url, asset in self.assets.items():
+            if "error" in asset or not 200 <= asset.get("status", 200) < 400:
+                (failed if self.same_site(url) else offsite_failed).append(url)
+
+        def shown(url):
+            # Report local assets by site path rather than the stand-in origin
+            if self.site_dir is not None and url.startswith(LOCAL_ORIGIN):
+                return urlparse(url).path
+            return url
+
+        sized = [(url, asset) for url, asset in self.assets.items()
+                 if "transfer_bytes" in asset]
+        largest = sorted(sized, key=lambda item: (-item[1]["transfer_bytes"], shown(item[0])))
+        TRACER.count("assets", len(urls))
+        return {
+            "assets": len(urls),
+            "heaviest_pages": sorted(weights, key=lambda w: (-w["page_bytes"], w["url"]))[:AUDIT_TOP],
+            "largest_assets": [dict(asset, url=shown(url), pages=len(used_by[url]))
+                               for url, asset in largest[:AUDIT_TOP]],
+            "failed": [dict(self.assets[url], url=shown(url)) for url in failed],
+            "offsite_failed": [dict(self.assets[url], url=url) for url in offsite_failed],
+            "uncompressed": [shown(url) for url, asset in sized
+                             if asset["content_encoding"] == "identity"
+                             and asset["transfer_bytes"] >= MIN_COMPRESSIBLE_BYTES
+                             and any(kind in asset.get("content_type", "")
+                                     for kind in COMPRESSIBLE_TYPES)],
+        }
+
+
+def load_test(urls, requests_total: int = LOAD_REQUESTS,
+              concurrency: int = LOAD_CONCURRENCY) -> dict:
+    """Replay urls round-robin and measure throughput and latency
+
+    Each worker thread reuses keep-alive connections from one shared pool,
+    like the checks do. Latency covers the full body download.
+    """
+    urls = list(urls)
+    latencies = []
+    errors = {}
+    transferred = 0
+    lock = threading.Lock()
+
+    def hit(number):
+        nonlocal transferred
+        url = urls[number % len(urls)]
+        start = time.perf_counter()
+        try:
+            with fetch(url, session, stream=True) as res:
+                for _ in res.raw.stream(CHUNK_SIZE, decode_content=False):
+                    pass
+                size, status = res.raw.tell(), res.status_code
+            error = None if 200 <= status < 400 else f"HTTP {status}"
+        except Exception as e:
+            size, error = 0, type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            transferred += size
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+
+    with make_session(concurrency) as session:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(hit, range(requests_total)))
+        seconds = time.perf_counter() - start
+
+    latency = {f"p{pct}": ms(percentile(latencies, pct)) for pct in PERCENTILES}
+    latency["max"] = ms(max(latencies))
+    TRACER.count("load requests", requests_total)
+    return {
+        "urls": len(urls),
+        "requests": requests_total,
+        "concurrency": concurrency,
+        "seconds": round(seconds, 3),
+        "requests_per_sec": round(requests_total / seconds, 1) if seconds else None,
+        "transfer_bytes": transferred,
+        "latency_ms": latency,
+        "errors": errors,
+    }
+
+
+def percentile(values, pct: int):
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[rank - 1]
+
+
+def page_metrics(details: dict) -> dict:
+    """Flatten the timing and size figures of one check
+
+    A 304 transfers no body, so its page weighs what the cached copy did;
+    otherwise a revalidated page would pass any transfer budget.
+    """
+    metrics = dict(details.get("timing", {}))
+    size = details.get("size", {})
+    metrics.update((k, v) for k, v in size.items() if k in BUDGET_METRICS)
+    if "cached_transfer_bytes" in size:
+        metrics["transfer_bytes"] = size["cached_transfer_bytes"]
+    return metrics
+
+
+def summarize(checks) -> dict:
+    """Aggregate per-page metrics into p50/p95/p99 figures and totals"""
+    summary = {"pages": len(checks)}
+    all_metrics = [page_metrics(details) for details in checks]
+    for metric in BUDGET_METRICS:
+        values = [m[metric] for m in all_metrics if metric in m]
+        if not values:
+            continue
+        summary[metric] = {f"p{pct}": percentile(values, pct)
+                           for pct in PERCENTILES}
+        summary[metric]["max"] = max(values)
+        if metric.endswith("_bytes"):
+            summary[metric]["total"] = sum(values)
+    uncompressed = [details["url"] for details in checks
+                    if details.get("size", {}).get("content_encoding") == "identity"
+                    and details["url"].startswith("http")]
+    if uncompressed:
+        summary["uncompressed"] = uncompressed
+    return summary
+
+
+def load_budgets(budget_file: str) -> dict:
+    with open(budget_file) as f:
+        budgets = json.load(f)
+    return {"default": budgets.get("default", {}),
+            "pages": budgets.get("pages", {})}
+
+
+def budget_for(budgets: dict, url: str) -> dict:
+    """Merge the default budget with every page pattern matching url's path"""
+    path = urlparse(url).path
+    budget = dict(budgets["default"])
+    for pattern, overrides in budgets["pages"].items():
+        if fnmatch.fnmatch(path, pattern):
+            budget.update(overrides)
+    return budget
+
+
+def apply_budgets(outcomes, budgets: dict):
+    """Fail checks whose metrics exceed their budget, listing each overrun"""
+    checked = []
+    for ok, details in outcomes:
+        metrics = page_metrics(details)
+        over = [
+            f"{metric} {metrics[metric]} > {limit}"
+            for metric, limit in budget_for(budgets, details["url"]).items()
+            if metric in metrics and metrics[metric] > limit
+        ]
+        if over:
+            details["ok"] = ok = False
+            details["over_budget"] = over
+        checked.append((ok, details))
+    return checked
+
+
+def report(results: dict, outcomes) -> int:
+    """Print the JSON report for outcomes and return the exit code"""
+    with TRACER.stage("report"):
+        if BUDGET_FILE:
+            outcomes = apply_budgets(outcomes, load_budgets(BUDGET_FILE))
+        overall_ok = all(ok for ok, _ in outcomes)
+        broken = results.get("links", {}).get("broken")
+        if broken and LINKS_REPORT_ONLY:
+            results["links"]["report_only"] = True
+            print(f"⚠️  {sum(len(links) for links in broken.values())} broken links on "
+                  f"{len(broken)} pages (CHECK_LINKS=report, not failing)", file=sys.stderr)
+        elif broken:
+            overall_ok = False
+        if results.get("audit", {}).get("failed"):
+            overall_ok = False
+        offsite_failed = results.get("audit", {}).get("offsite_failed")
+        if offsite_failed:
+            print(f"⚠️  {len(offsite_failed)} assets on other origins failed to load "
+                  "(not failing)", file=sys.stderr)
+        results["checks"] = [details for _, details in outcomes]
+        results["summary"] = summarize(results["checks"])
+    TRACER.count("pages", len(outcomes))
+    TRACER.count("failed", sum(not ok for ok, _ in outcomes))
+
+    print(json.dumps(results, indent=2))
+    TRACER.finish()
+    return 0 if overall_ok else 1
+
+
+def main_offline(site_dir: Path):
+    results = {"base_url": site_dir.as_uri() + "/", "checks": []}
+    if not site_dir.is_dir():
+        print(json.dumps({"error": "Site directory not found", **results},
+                         indent=2))
+        TRACER.finish()
+        return 2
+
+    if EXPECTED_VERSION:
+        # The build must embed the marker the post-deploy probe will wait for
+        try:
+            with open(site_dir / VERSION_PATH, encoding="utf-8") as f:
+                version = json.load(f).get("commit")
+        except (OSError, ValueError) as e:
+            version = f"unreadable ({e})"
+        results["version"] = version
+        if not same_commit(version, EXPECTED_VERSION):
+            print(json.dumps({"error": f"{VERSION_PATH} does not report {EXPECTED_VERSION}",
+                              **results}, indent=2))
+            TRACER.finish()
+            return 2
+
+    virtual_base = LOCAL_ORIGIN + read_baseurl() + "/"
+    validator = LinkValidator(virtual_base, site_dir) if CHECK_LINKS else None
+    audit = ResourceAudit(virtual_base, site_dir) if AUDIT else None
+    with TRACER.stage("check files", pages=len(DEFAULT_PATHS)):
+        outcomes = check_site_dir(site_dir, DEFAULT_PATHS, validator, audit)
+    if validator is not None:
+        with TRACER.stage("validate links"):
+            results["links"] = validator.validate()
+    if audit is not None:
+        with TRACER.stage("audit"):
+            results["audit"] = audit.run()
+    return report(results, outcomes)
 
 
 def main():
+    if SITE_DIR:
+        return main_offline(Path(SITE_DIR).resolve())
+
     base_url = os.getenv(
         "BASE_URL",
         "https://cloudshare360.github.io/aws-devops-gitlab-cicd-spring-boot-angular-fargate/"
@@ -79,29 +1155,61 @@ def main():
         base_url += "/"
 
     results = {"base_url": base_url, "checks": []}
+    validator = LinkValidator(base_url) if CHECK_LINKS else None
+    audit = ResourceAudit(base_url) if AUDIT else None
 
-    if not wait_until_live(base_url):
-        print(json.dumps({"error": "Site not live yet", **results}, indent=2))
-        return 2
+    with make_session() as session:
+        with TRACER.stage("wait until live"):
+            results["readiness"] = wait_until_live(base_url, session)
+        if not results["readiness"]["live"]:
+            error = "Site not live yet"
+            if EXPECTED_VERSION:
+                error = f"Version {EXPECTED_VERSION} not deployed yet"
+            print(json.dumps({"error": error, **results}, indent=2))
+            TRACER.finish()
+            return 2
 
-    overall_ok = True
+        if DISCOVER == "crawl":
+            with TRACER.stage("crawl"):
+                outcomes = crawl(base_url, session, validator=validator, audit=audit)
+        elif DISCOVER == "sitemap":
+            try:
+                with TRACER.stage("sitemap"):
+                    paths = discover_sitemap(base_url, session)
+            except Exception as e:
+                print(f"Sitemap discovery failed ({e}); crawling instead",
+                      file=sys.stderr)
+                with TRACER.stage("crawl"):
+                    outcomes = crawl(base_url, session, validator=validator, audit=audit)
+            else:
+                with TRACER.stage("check pages", pages=len(paths)):
+                    outcomes = check_paths(base_url, paths, session,
+                                           validator=validator, audit=audit)
+        else:
+            with TRACER.stage("check pages", pages=len(DEFAULT_PATHS)):
+                outcomes = check_paths(base_url, DEFAULT_PATHS, session,
+                                       validator=validator, audit=audit)
 
-    for path in DEFAULT_PATHS:
-        try:
-            ok, details = check_url(base_url, path)
-            results["checks"].append(details)
-            if not ok:
-                overall_ok = False
-        except Exception as e:
-            overall_ok = False
-            results["checks"].append({
-                "url": urljoin(base_url, path),
-                "ok": False,
-                "error": str(e),
-            })
+        if validator is not None:
+            with TRACER.stage("validate links"):
+                results["links"] = validator.validate(session)
+        if audit is not None:
+            with TRACER.stage("audit"):
+                results["audit"] = audit.run(session)
 
-    print(json.dumps(results, indent=2))
-    return 0 if overall_ok else 1
+    if LOAD_REQUESTS > 0:
+        urls = [details["url"] for ok, details in outcomes if ok]
+        if urls:
+            with TRACER.stage("load test", requests=LOAD_REQUESTS):
+                results["load"] = load_test(urls)
+
+    if RESPONSE_CACHE.path is not None:
+        RESPONSE_CACHE.save()
+        results["cache"] = {"file": str(RESPONSE_CACHE.path),
+                            "hits": RESPONSE_CACHE.hits}
+        TRACER.count("cache hits", RESPONSE_CACHE.hits)
+
+    return report(results, outcomes)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for GitHub Pages serving a built Jekyll site
+- Serves _site/ under the site's baseurl (anything outside it is a 404)
+- Redirects directories without a trailing slash (301), maps /page to
+  page.html, and answers misses with the site's 404.html
+- Gzips text responses for clients that accept it, sends ETag,
+  Last-Modified and Cache-Control, and answers conditional requests with 304
+
+Usage:
+  python3 scripts/integration_tests/pages_server.py --site _site --port 4000
+  BASE_URL=http://127.0.0.1:4000/aws-devops-gitlab-cicd-spring-boot-angular-fargate/ \
+    python3 scripts/integration_tests/check_site.py
+
+The baseurl defaults to the one in _config.yml; only the standard library
+is needed.
+"""
+import re
+import sys
+import gzip
+import argparse
+import mimetypes
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+CONFIG_FILE = Path(__file__).resolve().parents[2] / "_config.yml"
+# GitHub Pages lets browsers and the CDN keep responses for ten minutes
+CACHE_CONTROL = "max-age=600"
+COMPRESSIBLE_TYPES = ("text/", "javascript", "json", "xml", "svg")
+MIN_GZIP_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def config_baseurl(config_file: Path = CONFIG_FILE) -> str:
+    """baseurl from _config.yml, e.g. "/repo", or "" when unset"""
+    try:
+        with open(config_file, encoding="utf-8") as f:
+            for line in f:
+                match = re.match(r"""baseurl:\s*["']?([^"'#\s]*)""", line)
+                if match:
+                    return normalize_baseurl(match.group(1))
+    except OSError:
+        pass
+    return ""
+
+
+def normalize_baseurl(baseurl: str) -> str:
+    baseurl = baseurl.strip("/")
+    return "/" + baseurl if baseurl else ""
+
+
+class SiteFiles:
+    """Resolves request paths to files and keeps gzipped bodies in memory"""
+
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+        self.lock = threading.Lock()
+        # path -> (mtime_ns, gzipped bytes)
+        self.gzipped = {}
+
+    def resolve(self, path: str):
+        """("file", Path), ("redirect", location) or ("missing", None)"""
+        target = (self.root / path.lstrip("/")).resolve()
+        if target != self.root and self.root not in target.parents:
+            return "missing", None
+        if target.is_dir():
+            if not path.endswith("/"):
+                return "redirect", path + "/"
+            target = target / "index.html"
+        elif not target.is_file() and target.with_name(target.name + ".html").is_file():
+            target = target.with_name(target.name + ".html")
+        if target.is_file():
+            return "file", target
+        return "missing", None
+
+    def gzip_body(self, file_path: Path, stat) -> bytes:
+        with self.lock:
+            cached = self.gzipped.get(file_path)
+        if cached and cached[0] == stat.st_mtime_ns:
+            return cached[1]
+        body = gzip.compress(file_path.read_bytes(), GZIP_LEVEL, mtime=0)
+        with self.lock:
+            self.gzipped[file_path] = (stat.st_mtime_ns, body)
+        return body
+
+
+def make_handler(files: SiteFiles, baseurl: str, quiet: bool = False):
+    class PagesHandler(BaseHTTPRequestHandler):
+        server_version = "PagesEmulator/1"
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this, keep-alive
+        # clients wait out the peer's delayed ACK (~40ms) on every response
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            if not quiet:
+                super().log_message(format, *args)
+
+        def do_HEAD(self):
+            self.respond(head=True)
+
+        def do_GET(self):
+            self.respond(head=False)
+
+        def respond(self, head: bool):
+            path = unquote(urlsplit(self.path).path)
+            if baseurl and path == baseurl:
+                return self.redirect(baseurl + "/")
+            if baseurl and not path.startswith(baseurl + "/"):
+                return self.not_found(head)
+            kind, found = files.resolve(path[len(baseurl):])
+            if kind == "redirect":
+                return self.redirect(baseurl + found)
+            if kind == "missing":
+                return self.not_found(head)
+            self.send_file(found, 200, head)
+
+        def redirect(self, location: str):
+            self.send_response(301)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def not_found(self, head: bool):
+            page = files.root / "404.html"
+            if page.is_file():
+                return self.send_file(page, 404, head, conditional=False)
+            body = b"<h1>404</h1>"
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def not_modified(self, etag: str, mtime: float) -> bool:
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                return etag in [tag.strip() for tag in if_none_match.split(",")]
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+                except (TypeError, ValueError):
+                    return False
+            return False
+
+        def send_file(self, file_path: Path, status: int, head: bool,
+                      conditional: bool = True):
+            stat = file_path.stat()
+            content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+            if content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+            compress = (any(kind in content_type for kind in COMPRESSIBLE_TYPES)
+                        and stat.st_size >= MIN_GZIP_BYTES
+                        and "gzip" in self.headers.get("Accept-Encoding", ""))
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-gz" if compress else ""}"'
+            if conditional and self.not_modified(etag, stat.st_mtime):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", CACHE_CONTROL)
+                self.end_headers()
+                return
+            body = files.gzip_body(file_path, stat) if compress else None
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body) if compress else stat.st_size))
+            if compress:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+            self.send_header("Cache-Control", CACHE_CONTROL)
+            self.end_headers()
+            if head:
+                return
+            if compress:
+                self.wfile.write(body)
+            else:
+                with open(file_path, "rb") as f:
+                    self.copyfile(f)
+
+        def copyfile(self, source):
+            while True:
+                chunk = source.read(64 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    return PagesHandler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a built Jekyll site like GitHub Pages")
+    parser.add_argument("--site", default="_site", help="built site directory (default _site)")
+    parser.add_argument("--baseurl", help="path prefix to serve under (default: from _config.yml)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--quiet", action="store_true", help="do not log requests")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    site = Path(args.site)
+    if not site.is_dir():
+        print(f"Site directory {site} not found; run `bundle exec jekyll build` first",
+              file=sys.stderr)
+        return 2
+    baseurl = normalize_baseurl(args.baseurl) if args.baseurl is not None else config_baseurl()
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(SiteFiles(site), baseurl, args.quiet))
+    server.daemon_threads = True
+    print(f"Serving {site} at http://{args.host}:{server.server_port}{baseurl}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
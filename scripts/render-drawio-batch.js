@@ -0,0 +1,82 @@
+#!/usr/bin/env node
+/**
+ * Batch draw.io renderer
+ * Starts one headless Chromium and renders every job through a pool of pages.
+ * The viewer is served locally (viewer-static.min.js + drawio-viewer/render.html)
+ * through request interception; every other network request is blocked.
+ *
+ * Usage: node scripts/render-drawio-batch.js jobs.json
+ *   jobs.json: {"viewer": "viewer-static.min.js", "pages": 4, "timeout": 30000,
+ *               "jobs": [{"input": "a.drawio", "output": "a.png"}, ...]}
+ * Prints one JSON line per job: {"input", "output", "ok", "error"}
+ */
+const { chromium } = require('playwright');
+const fs = require('fs');
+const path = require('path');
+
+const VIEWER_ORIGIN = 'http://drawio-viewer.local';
+const RENDER_PAGE = path.join(__dirname, 'drawio-viewer', 'render.html');
+
+async function openPage(browser, viewerJs, timeout) {
+  const page = await browser.newPage();
+  page.setDefaultTimeout(timeout);
+  await page.route('**/*', route => {
+    const url = new URL(route.request().url());
+    if (url.origin !== VIEWER_ORIGIN) {
+      return route.abort();
+    }
+    if (url.pathname === '/viewer.js') {
+      return route.fulfill({ path: viewerJs, contentType: 'application/javascript' });
+    }
+    if (url.pathname === '/render.html') {
+      return route.fulfill({ path: RENDER_PAGE, contentType: 'text/html' });
+    }
+    return route.fulfill({ status: 404, body: '' });
+  });
+  await page.goto(`${VIEWER_ORIGIN}/render.html`);
+  await page.waitForFunction(() => window.viewerReady === true);
+  return page;
+}
+
+async function renderJob(page, job) {
+  const xml = fs.readFileSync(job.input, 'utf8');
+  // Resolves once the page has painted and fonts/images loaded (see render.html)
+  await page.evaluate(source => window.renderDiagram(source), xml);
+  fs.mkdirSync(path.dirname(job.output), { recursive: true });
+  await page.locator('#graph').screenshot({ path: job.output, type: 'png' });
+}
+
+async function main() {
+  const config = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+  const jobs = config.jobs.slice();
+  const timeout = config.timeout || 30000;
+  const browser = await chromium.launch({ args: ['--no-sandbox'] });
+
+  async function worker() {
+    const page = await openPage(browser, config.viewer, timeout);
+    while (jobs.length > 0) {
+      const job = jobs.shift();
+      const result = { input: job.input, output: job.output, ok: true, error: null };
+      try {
+        await renderJob(page, job);
+      } catch (e) {
+        result.ok = false;
+        result.error = String(e && e.message ? e.message : e);
+      }
+      process.stdout.write(JSON.stringify(result) + '\n');
+    }
+    await page.close();
+  }
+
+  try {
+    const poolSize = Math.max(1, Math.min(config.pages || 1, jobs.length));
+    await Promise.all(Array.from({ length: poolSize }, worker));
+  } finally {
+    await browser.close();
+  }
+}
+
+main().catch(e => {
+  console.error(e);
+  process.exit(1);
+});
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Thumbnail stage for the diagram converters
+Downsamples the full-size PNG a converter just wrote instead of rendering
+the diagram a second time, so thumbnails always match the full image
+"""
+
+from pathlib import Path
+
+# Same box as diagram.sizes.thumbnail in _config.yml
+DEFAULT_SIZES = [(300, 200)]
+FORMATS = ['png', 'webp']
+WEBP_QUALITY = 80
+# Flat diagram colors survive palette reduction well, and it shrinks PNGs a lot
+PNG_COLORS = 256
+
+
+def parse_size(value):
+    """argparse type for WIDTHxHEIGHT (or a single number for a square box)"""
+    try:
+        width, _, height = value.lower().partition('x')
+        size = (int(width), int(height or width))
+    except ValueError:
+        size = (0, 0)
+    if min(size) <= 0:
+        raise ValueError(f"invalid thumbnail size: {value!r}")
+    return size
+
+
+def thumbnail_paths(output_dir, stem, sizes=None, formats=None):
+    """Files write_thumbnails produces; the first size is <stem>_thumb"""
+    paths = []
+    for index, (width, height) in enumerate(dict.fromkeys(sizes or DEFAULT_SIZES)):
+        name = f"{stem}_thumb" if index == 0 else f"{stem}_thumb-{width}x{height}"
+        for fmt in dict.fromkeys(formats or ['png']):
+            paths.append(Path(output_dir) / f"{name}.{fmt}")
+    return paths
+
+
+def encode(image, path, fmt):
+    """Save one thumbnail with size-oriented encoder settings"""
+    if fmt == 'webp':
+        image.save(path, 'WEBP', quality=WEBP_QUALITY, method=6)
+        return
+    from PIL import Image
+    image.quantize(PNG_COLORS, method=Image.Quantize.FASTOCTREE).save(path, 'PNG', optimize=True)
+
+
+def write_thumbnails(source_png, output_dir, stem, sizes=None, formats=None):
+    """Downsample source_png (a path or an open PIL image) into every
+    thumbnail size and format
+
+    Each size fits inside its WIDTHxHEIGHT box, keeps the aspect ratio and
+    is never upscaled. Sizes are produced largest first, each from the
+    previous one when its box is large enough, so the full image is decoded
+    once and rarely reduced more than once. Returns the paths written;
+    empty when Pillow is not installed.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return []
+    sizes = list(dict.fromkeys(sizes or DEFAULT_SIZES))
+    formats = list(dict.fromkeys(formats or ['png']))
+    paths = iter(thumbnail_paths(output_dir, stem, sizes, formats))
+    targets = {size: [next(paths) for _ in formats] for size in sizes}
+
+    if isinstance(source_png, Image.Image):
+        full = source_png
+    else:
+        with Image.open(source_png) as image:
+            full = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    written = []
+    previous, current = None, full
+    for size in sorted(targets, key=lambda s: s[0] * s[1], reverse=True):
+        fits = previous is not None and size[0] <= previous[0] and size[1] <= previous[1]
+        current = (current if fits else full).copy()
+        current.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        previous = size
+        for fmt, path in zip(formats, targets[size]):
+            encode(current, path, fmt)
+            written.append(path)
+    return written
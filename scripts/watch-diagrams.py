@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Watch 40-resources/diagrams and rebuild what changed
+Uses inotify on Linux and falls back to polling elsewhere. Saves are
+debounced, then only the edited diagrams are reconverted and the index is
+refreshed from an in-memory catalog, so pages and data files for untouched
+diagrams are never rewritten. Run it next to `jekyll serve --livereload`.
+
+Arguments it does not know are passed to the converter, e.g.
+    python3 scripts/watch-diagrams.py --export-format none
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import argparse
+import subprocess
+import importlib.util
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+SOURCE_DIR = PROJECT_ROOT / "40-resources" / "diagrams"
+CONVERTERS = {
+    'simple': SCRIPT_DIR / "convert-drawio-simple.py",
+    'free': SCRIPT_DIR / "convert-drawio-free.py",
+}
+WATCHED_SUFFIXES = (".drawio", ".meta.yml")
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def diagram_stem(name):
+    """Diagram a file belongs to, or None for files we do not watch"""
+    for suffix in WATCHED_SUFFIXES:
+        if name.endswith(suffix) and not name.startswith('.'):
+            return name[:-len(suffix)]
+    return None
+
+
+class InotifyWatcher:
+    """Directory watcher on top of the inotify syscalls (Linux only)"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+        self.directory = directory
+
+    def wait(self, timeout):
+        """Names touched within timeout seconds (None waits forever)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        offset = 0
+        while offset < len(buffer):
+            _, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; treat every diagram as changed
+                names.update(path.name for path in Path(self.directory).iterdir())
+            elif length:
+                names.add(os.fsdecode(buffer[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher comparing mtimes and sizes every interval"""
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        state = {}
+        for path in self.directory.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state[path.name] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def wait(self, timeout):
+        """Names that changed; sleeps at most one interval"""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self.snapshot()
+        changed = {name for name in set(current) | set(self.state)
+                   if current.get(name) != self.state.get(name)}
+        self.state = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory, poll=False, interval=1.0):
+    if not poll:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}), polling every {interval}s")
+    return PollingWatcher(directory, interval)
+
+
+def load_index_generator():
+    """Import generate-diagram-index.py (its name is not a valid module name)"""
+    spec = importlib.util.spec_from_file_location(
+        "generate_diagram_index", SCRIPT_DIR / "generate-diagram-index.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Rebuilder:
+    """Keeps the scanned catalog in memory and refreshes single entries"""
+
+    def __init__(self, converter, converter_args):
+        self.converter = converter
+        self.converter_args = converter_args
+        self.index = load_index_generator()
+        self.index.ensure_directories()
+        store = self.index.MetadataStore(self.index.DIAGRAM_SOURCE_DIR)
+        self.catalog = {diagram['id']: diagram for diagram in self.index.scan_diagrams(store)}
+        store.save()
+
+    def rebuild(self, stems, drawio_changed):
+        started = time.perf_counter()
+        if drawio_changed:
+            command = [sys.executable, str(self.converter)] + self.converter_args
+            for stem in sorted(drawio_changed):
+                command += ['--only', stem]
+            # A run for deleted diagrams only prunes, which the converter counts as nothing done
+            existing = [stem for stem in drawio_changed if (SOURCE_DIR / f"{stem}.drawio").exists()]
+            if subprocess.run(command, cwd=PROJECT_ROOT).returncode != 0 and existing:
+                print("⚠️  Converter reported failures, see above")
+
+        store = self.index.MetadataStore(self.index.DIAGRAM_SOURCE_DIR)
+        for stem in stems:
+            if (SOURCE_DIR / f"{stem}.drawio").exists():
+                self.catalog[stem] = self.index.scan_diagram(store, stem)
+            else:
+                self.catalog.pop(stem, None)
+        store.save()
+        diagrams = [self.catalog[stem] for stem in sorted(self.catalog)]
+        self.index.write_catalog(diagrams)
+        print(f"✅ Rebuilt {', '.join(sorted(stems))} in {time.perf_counter() - started:.2f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Reconvert diagrams and refresh the index as .drawio files change",
+        epilog="Unknown options are passed on to the converter.")
+    parser.add_argument('--converter', choices=sorted(CONVERTERS), default='simple',
+                        help="converter script to run for changed diagrams")
+    parser.add_argument('--debounce', type=float, default=0.5, metavar='SECONDS',
+                        help="wait this long after the last save before rebuilding")
+    parser.add_argument('--poll', action='store_true',
+                        help="poll for changes instead of using inotify")
+    parser.add_argument('--interval', type=float, default=1.0, metavar='SECONDS',
+                        help="polling interval")
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None):
+    args, converter_args = parse_args(argv)
+    # generate-diagram-index.py works with paths relative to the project root
+    os.chdir(PROJECT_ROOT)
+    rebuilder = Rebuilder(CONVERTERS[args.converter], converter_args)
+    watcher = open_watcher(SOURCE_DIR, args.poll, args.interval)
+    print(f"👀 Watching {SOURCE_DIR.relative_to(PROJECT_ROOT)} ({type(watcher).__name__}), Ctrl+C to stop")
+
+    pending, drawio_changed, deadline = set(), set(), None
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            for name in watcher.wait(timeout):
+                stem = diagram_stem(name)
+                if stem is None:
+                    continue
+                pending.add(stem)
+                if name.endswith(".drawio"):
+                    drawio_changed.add(stem)
+                # Every new save pushes the rebuild back
+                deadline = time.monotonic() + args.debounce
+            if deadline is not None and time.monotonic() >= deadline:
+                try:
+                    rebuilder.rebuild(pending, drawio_changed)
+                except Exception as e:
+                    # e.g. a half-saved .meta.yml; the next save triggers a retry
+                    print(f"❌ Rebuild of {', '.join(sorted(pending))} failed: {e}")
+                pending, drawio_changed, deadline = set(), set(), None
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)